@@ -1,115 +1,144 @@
+import time
 from abc import ABC, abstractmethod
-from collections import deque
 
 import pygame
 
+from session import ENEMY_MOVE_DELAY, PLAYER_MOVE_DELAY
+
+# Arrow keys to grid steps
+KEY_DIRECTIONS = {
+    pygame.K_LEFT: (-1, 0),
+    pygame.K_RIGHT: (1, 0),
+    pygame.K_UP: (0, -1),
+    pygame.K_DOWN: (0, 1),
+}
+TURN_BUFFER_MS = 500   # how long a pressed turn waits for a cell where it becomes legal
+
+
 class Actor(ABC):
-    def __init__(self, maze):
+    def __init__(self, maze, now=0):
         self.x = 0
         self.y = 0
         self.maze = maze
-        self.move_delay = 150
-        self.last_move_time = pygame.time.get_ticks()
+        self.move_delay = PLAYER_MOVE_DELAY
+        self.last_move_time = now
         self.color = (255, 255, 255)
 
-    def move(self):
-        """Moves the player based on key input, ensuring valid movement in the maze."""
-        current_time = pygame.time.get_ticks()
-        if current_time - self.last_move_time < self.move_delay:
+    def move(self, now):
+        """
+        Takes the steps due by `now` (game clock, ms). Steps land every `move_delay` ms however
+        often this is called, so movement speed does not depend on the frame rate.
+        """
+        if now - self.last_move_time < self.move_delay:
             return  # Don't move if the delay hasn't passed
-
-        new_x, new_y = self._get_direction()
-        if self.maze.is_walkable(new_x, new_y):
+        if now - self.last_move_time >= 2 * self.move_delay:
+            # Standing still: step right away and start a fresh cadence from here
+            self.last_move_time = now - self.move_delay
+
+        while now - self.last_move_time >= self.move_delay:
+            new_x, new_y = self._get_direction(now)
+            if (new_x, new_y) == (self.x, self.y) or not self.maze.is_walkable(new_x, new_y):
+                return
             self.x = new_x
             self.y = new_y
-            self.last_move_time = current_time  # Reset timer on move
+            self.last_move_time += self.move_delay
 
     @abstractmethod
-    def _get_direction(self) -> tuple[int, int]:
+    def _get_direction(self, now) -> tuple[int, int]:
         ...
 
+    @property
+    def rect(self):
+        return self.maze.cell_rect(self.x, self.y)
+
     def draw(self):
         """Draws the player on the screen."""
-        pygame.draw.rect(
-            self.maze.screen, self.color,
-            (self.x * self.maze.cell_size, self.y * self.maze.cell_size, self.maze.cell_size, self.maze.cell_size)
-        )
+        pygame.draw.rect(self.maze.screen, self.color, self.rect)
 
 class Player(Actor):
-    def __init__(self, maze):
-        super().__init__(maze)
+    """
+    Driven by KEYDOWN/KEYUP events rather than polling, so a tap shorter than a step still counts.
+    Every press is also buffered as the next turn, applied at the first cell where it is legal
+    (Pac-Man style cornering), and until then the player keeps its heading. Otherwise it keeps
+    going while an arrow key is held.
+    """
+
+    def __init__(self, maze, now=0):
+        super().__init__(maze, now)
         self.color = (0, 255, 0)
-
-    def _get_direction(self):
-        dx, dy = 0, 0
-        # speed = 0.05
-
-        keys = pygame.key.get_pressed()
-        if keys[pygame.K_LEFT]:
-            dx = -1
-        elif keys[pygame.K_RIGHT]:
-            dx = 1
-        elif keys[pygame.K_UP]:
-            dy = -1
-        elif keys[pygame.K_DOWN]:
-            dy = 1
-        # dx *= speed
-        # dy *= speed
-        new_x, new_y = self.x + dx, self.y + dy
-        return new_x, new_y
+        self.held = []          # directions of arrow keys currently down, latest last
+        self.queued_turn = None  # (direction, pressed at game ms)
+        self.heading = None     # direction of the last step taken
+        self.input_log = []     # (perf_counter_ns, event, key name) for the scene to write out
+
+    def handle_event(self, event, event_ns, now):
+        direction = KEY_DIRECTIONS.get(getattr(event, "key", None))
+        if direction is None:
+            return
+        if event.type == pygame.KEYDOWN:
+            if direction in self.held:
+                self.held.remove(direction)
+            self.held.append(direction)
+            self.queued_turn = (direction, now)
+            self.input_log.append((event_ns, "keydown", pygame.key.name(event.key)))
+        elif event.type == pygame.KEYUP and direction in self.held:
+            self.held.remove(direction)
+
+    def _get_direction(self, now):
+        walkable = self.maze.is_walkable
+        if self.queued_turn is not None:
+            direction, pressed_at = self.queued_turn
+            if now - pressed_at > TURN_BUFFER_MS:
+                self.queued_turn = None
+            elif walkable(self.x + direction[0], self.y + direction[1]):
+                self.queued_turn = None
+                self.input_log.append((time.perf_counter_ns(), "turn_applied", f"{self.x + direction[0]},{self.y + direction[1]}"))
+                return self._step(direction)
+            elif self.heading is not None and walkable(self.x + self.heading[0], self.y + self.heading[1]):
+                # The turn is not legal yet: carry on towards the cell where it will be
+                return self._step(self.heading)
+
+        # Latest held key first, but a key pointing into a wall does not stop an earlier one
+        for direction in reversed(self.held):
+            if walkable(self.x + direction[0], self.y + direction[1]):
+                return self._step(direction)
+        return self.x, self.y
+
+    def _step(self, direction):
+        self.heading = direction
+        return self.x + direction[0], self.y + direction[1]
 
     def draw(self):
         # Draw Pac-Man as a yellow circle
         pygame.draw.circle(
             self.maze.screen,
             (255, 255, 0),   # yellow
-            (
-                self.x * self.maze.cell_size + self.maze.cell_size // 2,
-                self.y * self.maze.cell_size + self.maze.cell_size // 2
-            ),
-            self.maze.cell_size // 2 - 4
+            self.rect.center,
+            max(1, self.maze.cell_size // 2 - 4)
         )
 
 
 
 class Enemy(Actor):
-    def __init__(self, maze, player):
-        super().__init__(maze)
+    def __init__(self, maze, player, now=0, move_delay=ENEMY_MOVE_DELAY):
+        super().__init__(maze, now)
         self.color = (255, 0, 0)
         self.player = player
+        self.move_delay = move_delay
 
-    def _get_direction(self):
-        queue = deque([((self.x, self.y), [])])  # (current position, path taken)
-        visited = set()
-
-        while queue:
-            (x, y), path = queue.popleft()
-            if (x, y) == (self.player.x, self.player.y):
-                if len(path) < 1:
-                    continue
-                return path[1]  # first element is current position, so get the next element
-
-            if (x, y) in visited:
-                continue
-            visited.add((x, y))
-
-            # Check all possible moves (up, down, left, right)
-            for dx, dy in [(1, 0), (-1, 0), (0, 1), (0, -1)]:
-                nx, ny = x + dx, y + dy
-                if self.maze.is_walkable(nx, ny) and (nx, ny) not in visited:
-                    queue.append(((nx, ny), path + [(x, y)]))
-
-        raise IndexError('Error finding next decision for Enemy.')
+    def _get_direction(self, now):
+        """Steps to the neighbour closest to the player according to the maze's shared distance field."""
+        field = self.maze.distance_field((self.player.x, self.player.y))
+        return self.maze.step_towards(self.x, self.y, field)
 
+    def has_caught(self, player):
+        return (self.x, self.y) == (player.x, player.y)
 
     def draw(self):
         # Draw enemy as a red circle
         pygame.draw.circle(
             self.maze.screen,
             (255, 0, 0),   # red
-            (
-                self.x * self.maze.cell_size + self.maze.cell_size // 2,
-                self.y * self.maze.cell_size + self.maze.cell_size // 2
-            ),
-            self.maze.cell_size // 2 - 4
+            self.rect.center,
+            max(1, self.maze.cell_size // 2 - 4)
         )
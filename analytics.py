@@ -0,0 +1,236 @@
+"""
+Incremental analytics over every participant's data/{participant_id}_trials.csv.
+
+Rows are appended to a columnar store (one typed `array` file per column under data/analytics) and
+each CSV's byte offset is remembered, so a re-run only reads what was written since the last one.
+Summaries are computed over whole columns with C-level passes (bytes.translate, map, compress).
+
+    python analytics.py                 # ingest new rows, print summaries per agent and per class
+    python analytics.py --json out.json
+"""
+import argparse
+import csv
+import glob
+import json
+import math
+import operator
+import os
+import time
+from array import array
+from itertools import compress
+
+# (column, array typecode); door columns hold 0 = left, 1 = right, 255 = missing
+COLUMNS = [
+    ("participant", "I"),
+    ("hallway", "B"),
+    ("trial", "B"),
+    ("agent", "B"),         # code into the store's agent list, so at most 255 distinct images
+    ("advised_door", "B"),
+    ("correct_door", "B"),
+    ("player_choice", "B"),
+    ("correct", "B"),
+    ("health_after", "h"),
+    ("time_remaining", "d"),
+]
+_PARSED_COLUMNS = [column for column in COLUMNS if column[0] not in ("participant", "agent")]
+DOOR_CODES = {"left": 0, "right": 1}
+MISSING = 255
+_HAS_VALUE = b"\x01" * MISSING + b"\x00"  # translate table: MISSING -> 0, any door code -> 1
+APPEARANCE_CLASSES = {"F": "female", "M": "male", "N": "neutral"}
+
+
+class TrialStore:
+    """The columnar store under `directory` plus what has been read from each CSV so far."""
+
+    def __init__(self, directory="data/analytics"):
+        self.directory = directory
+        self.state = {"rows": 0, "files": {}, "participants": [], "agents": []}
+        state_path = os.path.join(directory, "state.json")
+        if os.path.exists(state_path):
+            with open(state_path) as f:
+                self.state = json.load(f)
+
+        rows = self.state["rows"]
+        self.columns = {}
+        for name, typecode in COLUMNS:
+            column = array(typecode)
+            path = self._column_path(name)
+            if os.path.exists(path):
+                with open(path, "rb") as f:
+                    column.fromfile(f, rows)
+            self.columns[name] = column
+        self._participant_codes = {pid: code for code, pid in enumerate(self.state["participants"])}
+        self._agent_codes = {agent: code for code, agent in enumerate(self.state["agents"])}
+
+    def __len__(self):
+        return self.state["rows"]
+
+    def _column_path(self, name):
+        return os.path.join(self.directory, f"{name}.col")
+
+    def ingest(self, data_dir="data"):
+        """Appends rows written since the last ingest; returns how many were added."""
+        files = self.state["files"]
+        new = {name: array(typecode) for name, typecode in COLUMNS}
+        for path in sorted(glob.glob(os.path.join(data_dir, "*_trials.csv"))):
+            name = os.path.basename(path)
+            seen = files.get(name, {"offset": 0, "header": None})
+            size = os.path.getsize(path)
+            if size == seen["offset"]:
+                continue
+            if size < seen["offset"]:
+                print(f"Skipping {name}: it shrank since it was ingested (rebuild the store to re-read it)")
+                continue
+
+            with open(path, "rb") as f:
+                f.seek(seen["offset"])
+                chunk = f.read()
+            end = chunk.rfind(b"\n") + 1  # a session may still be writing its last row
+            if end == 0:
+                continue
+            rows = csv.reader(chunk[:end].decode().splitlines())
+            header = seen["header"] or next(rows)
+            self._append_rows(new, header, rows)
+            files[name] = {"offset": seen["offset"] + end, "header": header}
+
+        added = len(new["participant"])
+        if added:
+            self._save(new)
+        return added
+
+    def _append_rows(self, new, header, rows):
+        position = {field: index for index, field in enumerate(header)}
+        get = lambda row, field, default="": row[position[field]] if field in position else default
+        for row in rows:
+            if not row:
+                continue
+            try:
+                values = (
+                    int(get(row, "hallway", 0)),
+                    int(get(row, "trial", 0)),
+                    DOOR_CODES.get(get(row, "advised_door"), MISSING),
+                    DOOR_CODES.get(get(row, "correct_door"), MISSING),
+                    DOOR_CODES.get(get(row, "player_choice"), MISSING),
+                    get(row, "correct") == "True",
+                    int(float(get(row, "health_after", 0))),
+                    float(get(row, "time_remaining", "nan")),
+                )
+            except (ValueError, IndexError):
+                print(f"Skipping malformed row: {row}")
+                continue
+            new["participant"].append(self._code(self._participant_codes, self.state["participants"], get(row, "participant_id")))
+            new["agent"].append(self._code(self._agent_codes, self.state["agents"], get(row, "agent_image")))
+            for (name, _), value in zip(_PARSED_COLUMNS, values):
+                new[name].append(value)
+
+    @staticmethod
+    def _code(codes, values, value):
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(values)
+            values.append(value)
+        return code
+
+    def _save(self, new):
+        os.makedirs(self.directory, exist_ok=True)
+        rows = self.state["rows"]
+        for name, typecode in COLUMNS:
+            path = self._column_path(name)
+            with open(path, "ab") as f:
+                # Drop anything past the committed row count, e.g. from a run that died before saving state
+                f.truncate(rows * array(typecode).itemsize)
+                new[name].tofile(f)
+            self.columns[name].extend(new[name])
+        self.state["rows"] = rows + len(new["participant"])
+
+        state_path = os.path.join(self.directory, "state.json")
+        with open(state_path + ".tmp", "w") as f:
+            json.dump(self.state, f)
+        os.replace(state_path + ".tmp", state_path)
+
+    def summarize(self, by="agent"):
+        """
+        Per agent image (`by="agent"`) or appearance class (`by="class"`): trials, compliance (chose
+        the advised door), compliance when the advice was wrong, accuracy and mean time remaining (s).
+        Rows without an advised door (CSVs from before it was logged) count towards accuracy and time
+        but not compliance; `no_advice` says how many there were.
+        """
+        agents = self.state["agents"]
+        if by == "agent":
+            labels = agents
+            groups = self.columns["agent"].tobytes()
+        elif by == "class":
+            labels = sorted(set(APPEARANCE_CLASSES.get(agent[:1], "other") for agent in agents))
+            to_class = bytes(labels.index(APPEARANCE_CLASSES.get(agent[:1], "other")) for agent in agents)
+            groups = self.columns["agent"].tobytes().translate(to_class.ljust(256, b"\xff"))
+        else:
+            raise ValueError(f"Cannot summarize by '{by}'")
+
+        columns = self.columns
+        advised = columns["advised_door"].tobytes()
+        has_advice = advised.translate(_HAS_VALUE)
+        followed = bytes(map(operator.and_, has_advice, map(operator.eq, advised, columns["player_choice"].tobytes())))
+        misled = bytes(map(operator.and_, has_advice, map(operator.ne, advised, columns["correct_door"].tobytes())))
+        followed_misled = bytes(map(operator.and_, followed, misled))
+        correct = columns["correct"].tobytes()
+        time_remaining = columns["time_remaining"]
+
+        summary = {}
+        for code, label in sorted(enumerate(labels), key=lambda item: item[1]):
+            mask = groups.translate(_select(code))
+            trials = mask.count(1)
+            if not trials:
+                continue
+            advised_trials = sum(compress(has_advice, mask))
+            misled_trials = sum(compress(misled, mask))
+            summary[label] = {
+                "trials": trials,
+                "no_advice": trials - advised_trials,
+                "compliance_rate": sum(compress(followed, mask)) / advised_trials if advised_trials else None,
+                "misled_compliance_rate": sum(compress(followed_misled, mask)) / misled_trials if misled_trials else None,
+                "accuracy": sum(compress(correct, mask)) / trials,
+                "mean_time_remaining": math.fsum(compress(time_remaining, mask)) / trials,
+            }
+        return summary
+
+
+def _select(code):
+    """A bytes.translate table mapping `code` to 1 and every other byte to 0."""
+    table = bytearray(256)
+    table[code] = 1
+    return bytes(table)
+
+
+def print_summary(title, summary):
+    print(f"\n{title}")
+    print(f"  {'':12} {'trials':>7} {'no advice':>9} {'comply':>7} {'misled':>7} {'accuracy':>9} {'time left':>10}")
+    rate = lambda value: f"{value:.1%}" if value is not None else "-"
+    for label, row in summary.items():
+        print(f"  {label:12} {row['trials']:7} {row['no_advice']:9} {rate(row['compliance_rate']):>7} "
+              f"{rate(row['misled_compliance_rate']):>7} {row['accuracy']:9.1%} {row['mean_time_remaining']:9.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--data", default="data", help="directory holding the *_trials.csv files")
+    parser.add_argument("--store", default="data/analytics")
+    parser.add_argument("--json", help="also write the summaries here")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    store = TrialStore(args.store)
+    added = store.ingest(args.data)
+    summaries = {"agent": store.summarize("agent"), "class": store.summarize("class")}
+    elapsed = time.perf_counter() - start
+
+    print(f"Ingested {added} new trials ({len(store)} total, "
+          f"{len(store.state['participants'])} participants) in {elapsed * 1000:.1f} ms")
+    print_summary("By agent image", summaries["agent"])
+    print_summary("By appearance class", summaries["class"])
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(summaries, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,35 +1,109 @@
-from flask import Flask, request, jsonify, render_template_string
-from main import Game
+from flask import Flask, Response, request, jsonify, render_template_string
+from workers import WorkerPool
+from ids import ParticipantIdAllocator
+from mazebank import MazeBank
+from session import ENEMY_MOVE_DELAY
+import json
 import multiprocessing
 import os
+import queue
+import threading
+import time
 
 app = Flask(__name__)
 
-current_process = None
-current_settings = {}  # store last-started game settings
-counter_file = "data/participant_counter.txt"
-
-# Ensure counter exists
-os.makedirs("data", exist_ok=True)
-if not os.path.exists(counter_file):
-	with open(counter_file, "w") as f:
-		f.write("1")
+# Live sessions keyed by station, one game process per testing booth
+sessions = {}
+finished_sessions = {}  # station -> last session that ended there
+reserved_stations = set()  # stations whose session is still being set up by /start_game
+sessions_lock = threading.Lock()
+max_sessions = int(os.environ.get("MAX_SESSIONS", 4))
+# Game processes that already have pygame, the display and the images loaded
+pool = WorkerPool(int(os.environ.get("WARM_WORKERS", 1)), width=800, height=800)
+# Safe to call from concurrent requests and from several server processes
+participant_ids = ParticipantIdAllocator()
+# Pre-built maze bank (see mazebank.py); sessions may then ask for a difficulty band
+maze_bank = os.environ.get("MAZE_BANK")
+bank = MazeBank(maze_bank) if maze_bank else None  # opened here as well, to check maze_band before a session starts
+# Counterbalanced schedules (see schedules.py), looked up by each session's participant ID
+schedule_file = os.environ.get("SCHEDULE_FILE")
+# Seconds a stopped session gets to finish its frame and close its logs before it is terminated
+stop_deadline = float(os.environ.get("STOP_DEADLINE", 5))
 
 
 def next_participant_id():
-	with open(counter_file, "r+") as f:
-		value = int(f.read().strip())
-		new_value = value + 1
-		f.seek(0)
-		f.write(str(new_value))
-		f.truncate()
-	return f"P-{value:05d}"   # Format: P-00001
+	return participant_ids.next_id()
+
+
+def session_info(session):
+	"""JSON-safe view of a session record."""
+	process = session["process"]
+	return {
+		"station": session["station"],
+		"participant_id": session["participant_id"],
+		"running": process.is_alive(),
+		"stopping": session.get("stop_requested_at") is not None and process.is_alive(),
+		"stopped": session.get("stopped"),
+		"exitcode": process.exitcode,
+		"elapsed": round((session.get("ended_at") or time.time()) - session["started_at"], 1),
+		"settings": session["settings"],
+		"startup": session.get("startup"),
+		"telemetry": session.get("telemetry"),
+	}
+
+
+def reap_finished():
+	"""Moves finished game processes out of the registry; never waits on a live child."""
+	with sessions_lock:
+		for station, session in list(sessions.items()):
+			if not session["process"].is_alive():
+				session["process"].join(timeout=0)
+				session["ended_at"] = time.time()
+				finished_sessions[station] = sessions.pop(station)
+
+
+def reaper(interval=1.0):
+	while True:
+		reap_finished()
+		time.sleep(interval)
+
+
+def collect_telemetry(interval=0.1):
+	"""Keeps the latest message each game published; the games never wait on this."""
+	while True:
+		with sessions_lock:
+			live = list(sessions.values())
+		for session in live:
+			channel = session.get("telemetry_queue")
+			try:
+				while channel is not None:
+					session["telemetry"] = channel.get_nowait()
+			except (queue.Empty, OSError, ValueError):
+				pass
+		time.sleep(interval)
 
 
-def run_game(width, height, num_levels, participant_id, time_per_hallway, enemy_speed, assistant_type):
-	game = Game(width, height, num_levels=num_levels, participant_id=participant_id, time_per_hallway=time_per_hallway,
-				enemy_speed=enemy_speed,assistant_type=assistant_type)
-	game.run()
+def begin_session(session, worker, config, requested_at):
+	"""Runs on its own thread: hands the config to the worker and records how long start-up took."""
+	session["startup"] = worker.start_session(config, requested_at)
+
+
+def end_session(session):
+	"""Runs on its own thread: asks the game to stop, escalating to terminate/kill after `stop_deadline`."""
+	how = session["worker"].stop(stop_deadline)
+	session["stopped"] = {
+		"how": how,
+		"ms": round((time.monotonic() - session["stop_requested_at"]) * 1000, 1),
+	}
+	reap_finished()
+
+
+def find_session(station=None, participant_id=None):
+	with sessions_lock:
+		for session in sessions.values():
+			if session["station"] == station or (participant_id and session["participant_id"] == participant_id):
+				return session
+	return None
 
 
 @app.route('/ui')
@@ -39,29 +113,79 @@ def ui():
       <body style="font-family:Arial; padding:40px;">
         <h2>Experiment Control Panel</h2>
 
+        <label>Station:</label>
+        <input id="station" type="text" value="booth-1"><br><br>
+
         <label>Number of Hallways:</label>
         <input id="levels" type="number" value="3" min="1" max="10"><br><br>
 
         <button onclick="startGame()">Start Session</button>
-        <button onclick="stopGame()" style="color:red; margin-left:20px;">STOP GAME</button>
+
+        <h3>Live sessions</h3>
+        <table id="sessions" border="1" cellpadding="6" style="border-collapse:collapse;">
+          <tr><th>Station</th><th>Participant</th><th>Scene</th><th>Hallway</th><th>Trial</th><th>Health</th>
+              <th>Time left (s)</th><th>Last decision</th><th>Frame ms (mean / worst)</th><th>Elapsed (s)</th><th></th></tr>
+        </table>
 
         <script>
         function startGame() {
           const levels = document.getElementById('levels').value;
+          const station = document.getElementById('station').value;
           fetch('/start_game', {
             method:'POST',
             headers:{'Content-Type':'application/json'},
-            body: JSON.stringify({num_levels: parseInt(levels)})
+            body: JSON.stringify({num_levels: parseInt(levels), station: station})
           })
           .then(r=>r.json())
-          .then(d=>alert("Started Participant: " + d.participant_id));
+          .then(d=>alert(d.error ? d.error : "Started Participant: " + d.participant_id + " on " + d.station))
+          .then(refresh);
         }
 
-        function stopGame() {
-          fetch('/stop_game', {method:'POST'})
+        function stopGame(station) {
+          fetch('/stop_game', {
+            method:'POST',
+            headers:{'Content-Type':'application/json'},
+            body: JSON.stringify({station: station})
+          })
           .then(r=>r.json())
-          .then(d=>alert(d.status));
+          .then(d=>alert(d.status))
+          .then(refresh);
         }
+
+        function render(d) {
+          const table = document.getElementById('sessions');
+          while (table.rows.length > 1) table.deleteRow(1);
+          d.sessions.forEach(s=>{
+            const t = s.telemetry || {};
+            const last = t.latest_decision;
+            const row = table.insertRow();
+            [
+              s.station,
+              s.participant_id,
+              t.scene || '',
+              t.hallway ? t.hallway + '/' + t.num_levels : '',
+              t.trial || '',
+              t.health ?? '',
+              t.time_remaining ?? '',
+              last ? last.agent_image + ': ' + last.choice + (last.correct ? ' (correct, ' : ' (wrong, ') + last.reaction_time_ms + ' ms)' : '',
+              t.mean_frame_ms ? t.mean_frame_ms + ' / ' + t.worst_frame_ms : '',
+              s.elapsed
+            ].forEach(value => row.insertCell().textContent = value);
+            const button = document.createElement('button');
+            button.textContent = s.stopping ? 'STOPPING' : 'STOP';
+            button.disabled = s.stopping;
+            button.style.color = 'red';
+            button.onclick = () => stopGame(s.station);
+            row.insertCell().appendChild(button);
+          });
+        }
+
+        function refresh() {
+          fetch('/get_status').then(r=>r.json()).then(render);
+        }
+
+        // Live updates for every booth over a single stream
+        new EventSource('/telemetry/stream').onmessage = e => render(JSON.parse(e.data));
         </script>
       </body>
     </html>
@@ -70,73 +194,163 @@ def ui():
 
 @app.route('/start_game', methods=['POST'])
 def start_game():
-	global current_process, current_settings
-
-	if current_process and current_process.is_alive():
-		return jsonify({"error": "A session is already running"}), 400
-
+	requested_at = time.monotonic()
+	reap_finished()
 	data = request.get_json(silent=True) or {}
+	station = str(data.get("station", "default"))
 	num_levels = data.get("num_levels", 3)
 	time_per_hallway = data.get("time_per_hallway", 50)
-	enemy_speed = data.get("enemy_speed", 500)
+	enemy_speed = data.get("enemy_speed", ENEMY_MOVE_DELAY)  # ms between enemy steps, in swarm mode too
 	assistant_type = data.get("assistant_type", "mixed")
+	maze_band = data.get("maze_band")
+	swarm_size = data.get("swarm_size", 0)  # enemies per maze in swarm mode, 0 for the single enemy
+	maze_cols = data.get("maze_cols")  # maze size in cells; by default larger in swarm mode (see session.py)
+	maze_rows = data.get("maze_rows")
+	for name, value in (("maze_cols", maze_cols), ("maze_rows", maze_rows)):
+		if value is None:
+			continue
+		if isinstance(value, bool) or not isinstance(value, int) or not 2 <= value <= 800:
+			return jsonify({"error": f"Bad {name}: expected a number of cells from 2 to 800"}), 400
+		if bank is not None and value != (bank.num_cols if name == "maze_cols" else bank.num_rows):
+			return jsonify({"error": f"Bad {name}: the maze bank holds {bank.num_cols}x{bank.num_rows} mazes"}), 400
+	if maze_band is not None:
+		if bank is None:
+			return jsonify({"error": "maze_band needs a maze bank (MAZE_BANK is not set)"}), 400
+		try:
+			bank.band(maze_band)
+		except (TypeError, ValueError) as error:
+			return jsonify({"error": f"Bad maze_band: {error}"}), 400
 
-	participant_id = next_participant_id()
+	with sessions_lock:
+		if station in sessions or station in reserved_stations:
+			return jsonify({"error": f"A session is already running on station {station}"}), 400
+		if len(sessions) + len(reserved_stations) >= max_sessions:
+			return jsonify({"error": f"Session limit reached ({max_sessions} running)"}), 429
+		reserved_stations.add(station)
 
-	current_settings = {
+	# The ID (a database transaction) and the worker (possibly a cold spawn) are fetched outside the
+	# lock, so status calls and the telemetry stream never wait on them
+	try:
+		participant_id = next_participant_id()
+		worker = pool.acquire()
+	except BaseException:
+		with sessions_lock:
+			reserved_stations.discard(station)
+		raise
+	settings = {
 		"width": 800,
 		"height": 800,
 		"num_levels": num_levels,
 		"participant_id": participant_id,
+		"station": station,
 	}
+	with sessions_lock:
+		reserved_stations.discard(station)
+		session = sessions[station] = {
+			"station": station,
+			"participant_id": participant_id,
+			"worker": worker,
+			"process": worker.process,
+			"telemetry_queue": worker.telemetry,
+			"settings": settings,
+			"started_at": time.time(),
+		}
 
-	current_process = multiprocessing.Process(
-		target=run_game,
-		args=(
-			800, 800,
-			num_levels,
-			participant_id,
-			time_per_hallway,
-			enemy_speed,
-			assistant_type
-		)
-	)
-	current_process.start()
+	# The request returns as soon as the session is registered; start-up timings show up in /get_status
+	config = {
+		"num_levels": num_levels,
+		"participant_id": participant_id,
+		"time_per_hallway": time_per_hallway,
+		"enemy_speed": enemy_speed,
+		"assistant_type": assistant_type,
+		"maze_bank": maze_bank,
+		"maze_band": maze_band,
+		"schedule_file": schedule_file,
+		"swarm_size": swarm_size,
+		"maze_cols": maze_cols,
+		"maze_rows": maze_rows,
+	}
+	threading.Thread(target=begin_session, args=(session, worker, config, requested_at), daemon=True).start()
 
 	return jsonify({
-		"status": "Game started",
+		"status": "Game starting",
 		"participant_id": participant_id,
-		"settings": current_settings
-	}), 200
+		"station": station,
+		"settings": settings,
+	}), 202
 
 
 @app.route('/get_status', methods=['GET'])
 def get_status():
-	"""Return whether a game is running + last settings."""
-	running = current_process is not None and current_process.is_alive()
+	"""Status of one station (?station= or ?participant_id=), or of every live session."""
+	reap_finished()
+	station = request.args.get("station")
+	participant_id = request.args.get("participant_id")
 
-	resp = {
-		"running": running,
-	}
-	if running:
-		resp["settings"] = current_settings
-	else:
-		resp["settings"] = current_settings or {}
+	if station or participant_id:
+		session = find_session(station, participant_id)
+		if session is None:
+			with sessions_lock:
+				session = finished_sessions.get(station) or next(
+					(s for s in finished_sessions.values() if s["participant_id"] == participant_id), None
+				)
+		if session is None:
+			return jsonify({"running": False, "settings": {}}), 200
+		return jsonify(session_info(session)), 200
+
+	with sessions_lock:
+		live = [session_info(session) for session in sessions.values()]
+	return jsonify({
+		"running": any(s["running"] for s in live),
+		"max_sessions": max_sessions,
+		"warm_workers": pool.idle_count(),
+		"sessions": live,
+	}), 200
 
-	return jsonify(resp), 200
+
+@app.route('/telemetry/stream')
+def telemetry_stream():
+	"""Server-Sent Events: a snapshot of every live session (or ?station=) whenever it changes."""
+	station = request.args.get("station")
+
+	def stream():
+		last = None
+		while True:
+			with sessions_lock:
+				live = [session_info(s) for s in sessions.values() if station in (None, s["station"])]
+			payload = json.dumps({"sessions": live, "max_sessions": max_sessions})
+			if payload != last:
+				yield f"data: {payload}\n\n"
+				last = payload
+			time.sleep(0.25)
+
+	return Response(stream(), mimetype="text/event-stream", headers={"Cache-Control": "no-cache"})
 
 
 @app.route('/stop_game', methods=['POST'])
 def stop_game():
-	global current_process, current_settings
-	if current_process and current_process.is_alive():
-		current_process.terminate()
-		current_process.join()
-		current_process = None
-		return jsonify({"status": "Game stopped"}), 200
-	return jsonify({"status": "No game running"}), 400
+	data = request.get_json(silent=True) or {}
+	participant_id = data.get("participant_id")
+	station = data.get("station", None if participant_id else "default")
+	session = find_session(station, participant_id)
+	if session is None or not session["process"].is_alive():
+		return jsonify({"status": "No game running"}), 400
+
+	with sessions_lock:
+		already_stopping = session.get("stop_requested_at") is not None
+		if not already_stopping:
+			session["stop_requested_at"] = time.monotonic()
+	if already_stopping:
+		return jsonify({"status": f"Already stopping the game on station {session['station']}"}), 202
+	# The game sees the request within a frame and closes its logs; the request does not wait for it
+	threading.Thread(target=end_session, args=(session,), daemon=True).start()
+	return jsonify({"status": f"Stopping game on station {session['station']}", "deadline_s": stop_deadline}), 202
 
 
 if __name__ == '__main__':
 	multiprocessing.set_start_method("spawn")
-	app.run(host='0.0.0.0', port=4000)
+	threading.Thread(target=reaper, daemon=True).start()
+	threading.Thread(target=collect_telemetry, daemon=True).start()
+	pool.fill()
+	# Each request on its own thread, so a slow start never holds up status polls or stops
+	app.run(host='0.0.0.0', port=4000, threaded=True)
@@ -0,0 +1,126 @@
+"""
+Pre-decoded image bundle.
+
+Build step: decodes and scales every image a session blits (see `main.asset_requests`) and writes the
+raw pixels into one file with a JSON index. At runtime the file is memory-mapped and each image becomes
+a Surface over its slice with `pygame.image.frombuffer`, so no PNG decoding or scaling happens.
+The bundle is built for one window size; anything not in it is still loaded from `images/`.
+
+    python assetbundle.py --width 800 --height 800
+"""
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+
+import pygame
+
+MAGIC = b"RJVABNDL"
+_HEADER = struct.Struct("<8sI")  # magic, index length; the index JSON and pixel data follow
+ALIGN = 16
+DEFAULT_NAME = "assets.bundle"
+
+
+def _padding(length):
+    return -length % ALIGN
+
+
+def resource_path(relative):
+    """Path of a file shipped with the game, inside the PyInstaller bundle when frozen."""
+    base = getattr(sys, "_MEIPASS", os.path.dirname(os.path.abspath(__file__)))
+    return os.path.join(base, relative)
+
+
+def list_assistants():
+    """Agent image filenames shipped with the game, sorted because listdir order varies by machine."""
+    return sorted(f for f in os.listdir(resource_path('images/assistants')) if f.endswith('.png'))
+
+
+def bundle_key(path, scale):
+    """Index key for an `AssetManager.get(path, scale)` request."""
+    if isinstance(scale, tuple):
+        return f"{path}@{scale[0]}x{scale[1]}"
+    return f"{path}@{scale!r}"
+
+
+class AssetBundle:
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, index_length = _HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not an asset bundle")
+        self.index = json.loads(self._map[_HEADER.size:_HEADER.size + index_length])
+        # Index offsets count from the (aligned) end of the index
+        self._view = memoryview(self._map)[_HEADER.size + index_length + _padding(_HEADER.size + index_length):]
+
+    def surface(self, path, scale):
+        """
+        An unconverted Surface backed by the mapped pixels, or None if the bundle lacks this request.
+        The caller converts it to the display format, which also copies it out of the map.
+        """
+        entry = self.index.get(bundle_key(path, scale))
+        if entry is None:
+            return None
+        offset, width, height, pixel_format = entry
+        length = width * height * len(pixel_format)
+        return pygame.image.frombuffer(self._view[offset:offset + length], (width, height), pixel_format)
+
+
+def open_bundle(path=None):
+    """The bundle at `path` (default: next to the game), or None if it has not been built."""
+    path = path or resource_path(DEFAULT_NAME)
+    return AssetBundle(path) if os.path.exists(path) else None
+
+
+def build(out, width, height):
+    """Decodes every request `main.asset_requests` makes for this window size into a bundle at `out`."""
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    from assets import AssetManager
+    from main import asset_requests
+
+    pygame.init()
+    pygame.display.set_mode((width, height))
+    assets = AssetManager()  # same decode and scale path as a live session, minus any existing bundle
+
+    index = {}
+    chunks = []
+    offset = 0
+    for path, scale in asset_requests(width, height, list_assistants()):
+        surface = assets.get(path, scale)
+        pixel_format = "RGBA" if surface.get_flags() & pygame.SRCALPHA else "RGB"
+        pixels = pygame.image.tobytes(surface, pixel_format)
+        index[bundle_key(path, scale)] = [offset, surface.get_width(), surface.get_height(), pixel_format]
+        chunks.append(pixels + b"\0" * _padding(len(pixels)))
+        offset += len(chunks[-1])
+    pygame.quit()
+
+    encoded = json.dumps(index).encode()
+    with open(out, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, len(encoded)))
+        f.write(encoded)
+        f.write(b"\0" * _padding(_HEADER.size + len(encoded)))
+        for chunk in chunks:
+            f.write(chunk)
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--width", type=int, default=800)
+    parser.add_argument("--height", type=int, default=800)
+    parser.add_argument("--out", default=resource_path(DEFAULT_NAME))
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    index = build(args.out, args.width, args.height)
+    print(f"Packed {len(index)} images in {time.perf_counter() - start:.1f}s -> {args.out} "
+          f"({os.path.getsize(args.out) / 1e6:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
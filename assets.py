@@ -0,0 +1,84 @@
+from collections import OrderedDict
+
+import pygame
+
+from assetbundle import resource_path
+
+
+class AssetManager:
+    """
+    Decodes, converts and scales images once and hands out ready-to-blit surfaces. Requests found in
+    `bundle` (an `assetbundle.AssetBundle`) skip the decode and scale and only need converting.
+    """
+
+    def __init__(self, max_bytes=256 * 1024 * 1024, bundle=None):
+        self.max_bytes = max_bytes
+        self.bundle = bundle
+        self.used_bytes = 0
+        self._cache = OrderedDict()  # (path, scale) -> Surface, least recently used first
+
+    def get(self, path, scale=1.0):
+        """
+        Returns the image at `path` scaled either by a factor or to an exact (width, height),
+        converted to the display format. Needs a display mode to be set.
+        """
+        key = (path, scale)
+        surface = self._cache.get(key)
+        if surface is not None:
+            self._cache.move_to_end(key)
+            return surface
+
+        surface = self.bundle.surface(path, scale) if self.bundle is not None else None
+        if surface is None:
+            surface = pygame.image.load(resource_path(path))
+            if isinstance(scale, tuple):
+                size = scale
+            else:
+                size = (int(surface.get_width() * scale), int(surface.get_height() * scale))
+            if size != surface.get_size():
+                surface = pygame.transform.scale(surface, size)
+        surface = surface.convert_alpha() if surface.get_flags() & pygame.SRCALPHA else surface.convert()
+
+        self._cache[key] = surface
+        self.used_bytes += self._size_of(surface)
+        while self.used_bytes > self.max_bytes and len(self._cache) > 1:
+            _, evicted = self._cache.popitem(last=False)
+            self.used_bytes -= self._size_of(evicted)
+        return surface
+
+    def preload(self, requests):
+        """Warms the cache with (path, scale) pairs, e.g. at session start."""
+        for path, scale in requests:
+            self.get(path, scale)
+
+    @staticmethod
+    def _size_of(surface):
+        return surface.get_width() * surface.get_height() * surface.get_bytesize()
+
+
+class TextCache:
+    """LRU cache of rendered text surfaces keyed by (text, colour, font)."""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()
+
+    def render(self, font, text, color):
+        key = (text, tuple(color), font)
+        surface = self._cache.get(key)
+        if surface is not None:
+            self.hits += 1
+            self._cache.move_to_end(key)
+            return surface
+
+        self.misses += 1
+        surface = font.render(text, True, color)
+        self._cache[key] = surface
+        if len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+        return surface
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._cache)}
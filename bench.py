@@ -0,0 +1,253 @@
+"""
+Benchmarks for the hot paths: maze generation and search, enemy routing, maze and hallway frames,
+swarm-mode frames and trial logging. Runs headless on SDL's dummy video driver and writes the results as JSON.
+
+    python bench.py --out data/bench.json
+    python bench.py --baseline data/bench.json --tolerance 0.25 --tolerance maze_init/1000=0.5
+
+With --baseline, any benchmark whose median is slower than the baseline by more than its tolerance
+is reported as a regression and the run exits with status 1.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import pygame
+
+from actors import Enemy, Player
+from maze import Maze
+
+SIZES = (12, 50, 200, 1000)
+QUICK_SIZES = (12, 50, 200)
+ENEMY_DISTANCES = (4, 16, 64, 256, 1024)
+SWARM_SIZES = (100, 300, 1000)
+SWARM_MAZE = 199          # cells per side; 4 px cells in an 800 px window
+FRAME_MS = 1000 // 60
+
+
+def measure(run, repeat, setup=None):
+    """Times `run(state)` `repeat` times, calling `setup()` untimed before each; returns summary stats in us."""
+    samples = []
+    for _ in range(repeat):
+        state = setup() if setup is not None else None
+        start = time.perf_counter_ns()
+        run(state)
+        samples.append(time.perf_counter_ns() - start)
+    samples.sort()
+    return {
+        "median_us": statistics.median(samples) / 1000,
+        "p95_us": samples[min(len(samples) - 1, int(len(samples) * 0.95))] / 1000,
+        "min_us": samples[0] / 1000,
+        "n": len(samples),
+    }
+
+
+def bench_maze(results, sizes, repeat):
+    for size in sizes:
+        reps = max(3, repeat // max(1, size // 50))  # the largest grids take ~1s a build
+        results[f"maze_init/{size}"] = measure(lambda _: Maze(None, num_cols=size, num_rows=size), reps)
+        results[f"maze_init_loops/{size}"] = measure(
+            lambda _: Maze(None, complexity=0.2, num_cols=size, num_rows=size), reps
+        )
+        # The constructor has already padded the grid for its own goal search, so drop the cached
+        # padded grid and junction graph to time the searches as on a first call
+        results[f"furthest_point/{size}"] = measure(
+            lambda maze: maze._get_furthest_point(), reps,
+            setup=lambda: _uncached(Maze(None, complexity=0.2, num_cols=size, num_rows=size))
+        )
+        results[f"junction_graph/{size}"] = measure(
+            lambda maze: maze.graph, reps,
+            setup=lambda: _uncached(Maze(None, complexity=0.2, num_cols=size, num_rows=size))
+        )
+
+
+def _uncached(maze):
+    maze._padded = maze._graph = None
+    return maze
+
+
+def bench_enemy(results, size, repeat):
+    """Latency of one enemy decision right after the player moved, by path distance to the player."""
+    maze = Maze(None, complexity=0.1, num_cols=size, num_rows=size, seed=1)
+    player = Player(maze)
+    enemy = Enemy(maze, player)
+    field = maze.distances_from(maze.start)
+    by_distance = {}
+    for y in range(maze.num_rows):
+        for x in range(maze.num_cols):
+            by_distance.setdefault(maze.distance_to(field, x, y), (x, y))
+    maze.graph  # built once per maze, as in a session
+
+    for wanted in ENEMY_DISTANCES:
+        distance = min((d for d in by_distance if d >= wanted), default=None)
+        if distance is None:
+            continue
+        player.x, player.y = by_distance[distance]
+
+        def decide(_):
+            maze._field_target = None  # the player just stepped, so the shared field is stale
+            enemy._get_direction(0)
+
+        results[f"enemy_direction/{size}/d{wanted}"] = measure(decide, repeat)
+
+
+def bench_frames(results, repeat, data_dir):
+    from main import Game
+    from scenes import HallwayScene, MazeScene
+
+    game = Game(800, 800, participant_id="BENCH", data_dir=data_dir, record_inputs=False)
+    game.start_time = 0
+    game.scheduler.now = 0
+
+    scene = MazeScene(game, 0)
+    scene.enter(0)
+    maze = scene.maze
+
+    def full_frame(_):
+        maze.draw()
+        pygame.display.update()
+
+    def actor_frame(_):
+        # What MazeScene.draw does when an actor steps: restore the old cell, draw, update both rects
+        scene.drawn_rects = [maze.cell_rect(2, 2)]
+        scene.draw()
+
+    results["maze_draw/full"] = measure(full_frame, repeat)
+    results["maze_draw/actor_step"] = measure(actor_frame, repeat)
+
+    trials = iter([(1, game.image_filenames[0], "left", "right")])
+    hallway = HallwayScene(game, 0, trials, 1, game.image_filenames[0], "left", "right")
+    results["hallway/compose"] = measure(lambda _: hallway.enter(0), repeat)
+    results["hallway/frame"] = measure(lambda _: hallway.draw(), repeat * 10)
+
+    # Decision logging: producer cost per row, and the time for the writer thread to drain them
+    count = repeat * 50
+    start = time.perf_counter_ns()
+    for trial in range(count):
+        game._log_decision(0, trial, "left", "left", "right", game.image_filenames[0], time.perf_counter_ns())
+    logged = time.perf_counter_ns()
+    game.logger.close()
+    drained = time.perf_counter_ns()
+    game.event_logger.close()
+    results["log_decision/call"] = {"median_us": (logged - start) / count / 1000, "n": count}
+    results["log_decision/throughput"] = {"rows_per_s": count / ((drained - start) / 1e9), "n": count}
+    pygame.quit()
+
+
+def bench_swarm(results, repeat):
+    """Swarm update and draw per 60 fps frame on a large maze, with the player stepping as fast as it can."""
+    import random
+    from session import PLAYER_MOVE_DELAY
+    from swarm import Swarm
+
+    pygame.init()
+    screen = pygame.display.set_mode((800, 800))
+    maze = Maze(screen, complexity=0.1, num_cols=SWARM_MAZE, num_rows=SWARM_MAZE, seed=1)
+    goal_field = maze.distances_from(maze.goal)
+    frames = repeat * 20
+    for size in SWARM_SIZES:
+        player = Player(maze)
+        swarm = Swarm(maze, player, size, random.Random(size))
+        maze.draw()
+        swarm.draw_all()
+        swarm.start(0)
+        state = {"now": 0, "drawn": (0, 0)}
+
+        def frame(_):
+            now = state["now"] = state["now"] + FRAME_MS
+            if now % PLAYER_MOVE_DELAY < FRAME_MS:
+                player.x, player.y = maze.step_towards(player.x, player.y, goal_field)
+            swarm.move(now)
+            swarm.has_caught(player)
+            cell = (player.x, player.y)
+            rects = swarm.draw([swarm.index(*state["drawn"])] if cell != state["drawn"] else [])
+            state["drawn"] = cell
+            pygame.display.update(rects)
+
+        results[f"swarm_frame/{size}"] = measure(frame, frames)
+    pygame.quit()
+
+
+def compare(results, baseline, tolerance, overrides):
+    """Benchmarks whose median got slower than the baseline by more than their tolerance."""
+    regressions = []
+    for name, result in results.items():
+        before = baseline.get("results", {}).get(name, {})
+        if "median_us" in result and "median_us" in before:
+            limit = overrides.get(name, tolerance)
+            if result["median_us"] > before["median_us"] * (1 + limit):
+                regressions.append(f"{name}: {result['median_us']:.1f}us vs {before['median_us']:.1f}us (+{limit:.0%} allowed)")
+        elif "rows_per_s" in result and "rows_per_s" in before:
+            limit = overrides.get(name, tolerance)
+            if result["rows_per_s"] < before["rows_per_s"] / (1 + limit):
+                regressions.append(f"{name}: {result['rows_per_s']:.0f} rows/s vs {before['rows_per_s']:.0f} (-{limit:.0%} allowed)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--out", default="data/bench.json")
+    parser.add_argument("--repeat", type=int, default=30)
+    parser.add_argument("--quick", action="store_true", help=f"grid sizes {QUICK_SIZES} instead of {SIZES}")
+    parser.add_argument("--baseline", help="earlier results JSON to check against")
+    parser.add_argument("--tolerance", action="append", default=[],
+                        help="allowed slowdown, e.g. 0.2 for all or name=0.5 for one benchmark")
+    args = parser.parse_args()
+
+    tolerance, overrides = 0.2, {}
+    for item in args.tolerance:
+        name, _, value = item.rpartition("=")
+        if name:
+            overrides[name] = float(value)
+        else:
+            tolerance = float(value)
+
+    sizes = QUICK_SIZES if args.quick else SIZES
+    results = {}
+    with tempfile.TemporaryDirectory() as data_dir:
+        bench_maze(results, sizes, args.repeat)
+        bench_enemy(results, sizes[-1], args.repeat)
+        with contextlib.redirect_stdout(io.StringIO()):  # scenes print progress on every enter
+            bench_frames(results, args.repeat, data_dir)
+        bench_swarm(results, args.repeat)
+
+    report = {
+        "meta": {"python": platform.python_version(), "pygame": pygame.version.ver, "machine": platform.machine(),
+                 "created": time.strftime("%Y-%m-%dT%H:%M:%S"), "repeat": args.repeat},
+        "results": results,
+    }
+    for name, result in results.items():
+        print(f"  {name:32} " + "  ".join(f"{key}={value:.1f}" for key, value in result.items() if key != "n"))
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), tolerance, overrides)
+
+    directory = os.path.dirname(args.out)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results -> {args.out}")
+
+    if regressions:
+        print(f"REGRESSION: {len(regressions)} benchmark(s) slower than {args.baseline}:")
+        for line in regressions:
+            print(f"  {line}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
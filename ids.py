@@ -0,0 +1,68 @@
+import os
+import sqlite3
+import threading
+from collections import deque
+from contextlib import closing
+
+
+class ParticipantIdAllocator:
+    """
+    Hands out unique `P-xxxxx` participant IDs backed by a SQLite counter in WAL mode, so several
+    server processes and request threads can allocate at the same time without handing out duplicates.
+
+    IDs are reserved from the database `block_size` at a time and served from memory; a block left
+    unused when the process exits is skipped, never reused. An ID whose trials CSV already exists
+    in `data_dir` is skipped as well.
+    """
+
+    def __init__(self, db_path="data/participants.sqlite3", data_dir="data", block_size=8,
+                 legacy_counter_file="data/participant_counter.txt"):
+        self.db_path = db_path
+        self.data_dir = data_dir
+        self.block_size = block_size
+        self._block = deque()
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        with closing(self._connect()) as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("CREATE TABLE IF NOT EXISTS counter (name TEXT PRIMARY KEY, next INTEGER NOT NULL)")
+            db.execute("INSERT OR IGNORE INTO counter (name, next) VALUES ('participant', ?)",
+                       (self._legacy_start(legacy_counter_file),))
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+
+    @staticmethod
+    def _legacy_start(counter_file):
+        """Continues numbering from the old plain-text counter if there is one."""
+        try:
+            with open(counter_file) as f:
+                return int(f.read().strip())
+        except (OSError, ValueError):
+            return 1
+
+    def reserve(self, count):
+        """Atomically claims `count` consecutive numbers and returns them as a range."""
+        db = self._connect()
+        try:
+            db.execute("BEGIN IMMEDIATE")  # takes the write lock before reading, so no two callers see the same value
+            (start,) = db.execute("SELECT next FROM counter WHERE name = 'participant'").fetchone()
+            db.execute("UPDATE counter SET next = ? WHERE name = 'participant'", (start + count,))
+            db.execute("COMMIT")
+        except BaseException:
+            if db.in_transaction:
+                db.execute("ROLLBACK")
+            raise
+        finally:
+            db.close()
+        return range(start, start + count)
+
+    def next_id(self):
+        with self._lock:
+            while True:
+                if not self._block:
+                    self._block.extend(self.reserve(self.block_size))
+                participant_id = f"P-{self._block.popleft():05d}"   # Format: P-00001
+                if not os.path.exists(os.path.join(self.data_dir, f"{participant_id}_trials.csv")):
+                    return participant_id
@@ -0,0 +1,101 @@
+import atexit
+import csv
+import json
+import os
+import queue
+import threading
+import time
+
+_STOP = object()
+
+
+class TrialLogger:
+    """
+    Queues log records and writes them in batches from a background thread.
+
+    Records are rows matching `fieldnames` and go to `{path}.csv`, `{path}.jsonl` or both,
+    depending on `formats`. `flush_interval` is how many seconds written rows may sit in the
+    file buffers (0 = flush after every batch); `fsync` also forces each flush to disk.
+    """
+
+    def __init__(self, path, fieldnames, formats=("csv",), flush_interval=0, fsync=False, batch_size=64):
+        self.fieldnames = list(fieldnames)
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.batch_size = batch_size
+        self._queue = queue.Queue()
+        self._closed = False
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._files = []
+        self._csv_writer = None
+        if "csv" in formats:
+            csv_file = open(f"{path}.csv", "a", newline="")
+            self._csv_writer = csv.writer(csv_file)
+            # Write header if it's a new file
+            if csv_file.tell() == 0:
+                self._csv_writer.writerow(self.fieldnames)
+            self._files.append(csv_file)
+        self._jsonl_file = None
+        if "jsonl" in formats:
+            self._jsonl_file = open(f"{path}.jsonl", "a")
+            self._files.append(self._jsonl_file)
+
+        self._thread = threading.Thread(target=self._run, name="TrialLogger", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def log(self, row):
+        """Queues one row; never touches the disk on the caller's thread."""
+        if not self._closed:
+            self._queue.put(row)
+
+    def close(self):
+        """Drains every queued row to disk and closes the files. Safe to call more than once."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join()
+        atexit.unregister(self.close)
+
+    def _run(self):
+        last_flush = time.monotonic()
+        timeout = self.flush_interval or None
+        while True:
+            try:
+                batch = [self._queue.get(timeout=timeout)]
+            except queue.Empty:
+                batch = []
+            while batch and batch[-1] is not _STOP and len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stopping = bool(batch) and batch[-1] is _STOP
+            rows = batch[:-1] if stopping else batch
+            if rows:
+                self._write(rows)
+            if stopping or time.monotonic() - last_flush >= self.flush_interval:
+                self._flush()
+                last_flush = time.monotonic()
+            if stopping:
+                for f in self._files:
+                    f.close()
+                return
+
+    def _write(self, rows):
+        if self._csv_writer is not None:
+            self._csv_writer.writerows(rows)
+        if self._jsonl_file is not None:
+            self._jsonl_file.write("".join(json.dumps(dict(zip(self.fieldnames, row))) + "\n" for row in rows))
+
+    def _flush(self):
+        for f in self._files:
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
@@ -1,28 +1,99 @@
-import os
-import sys
-from copy import deepcopy
+import time
+STARTED_AT = time.perf_counter()  # before the heavy imports, for the cold start figure
+
 import random
+import sys
 
-import csv, datetime
+import datetime
 import pygame
-from maze import Maze
-from actors import Player, Enemy
+from renderer import LayeredRenderer
+from assetbundle import list_assistants, open_bundle
+from assets import AssetManager, TextCache
+from timing import FrameStats
+from logger import TrialLogger
+from mazebank import MazeBank
+from profiler import FrameProfiler
+import session
+from session import TRIAL_FIELDS, EVENT_FIELDS
+from replay import InputRecorder
+from schedules import ScheduleBook
+from scenes import LiveInput, MazeScene, Scheduler
+from telemetry import Telemetry
+
+ASSISTANT_SCALE = 0.68   # your perfect size
+BUBBLE_SCALE = 0.11      # adjust if you want smaller or bigger bubbles
+
+
+def asset_requests(width, height, image_filenames):
+    """Every (path, scale) a session blits, so it can be preloaded before the first trial."""
+    return (
+        [('images/hallway.png', (width, height))]
+        + [(f"images/assistants/{filename}", ASSISTANT_SCALE) for filename in image_filenames]
+        + [(f"images/{direction}-speech-bubble.png", BUBBLE_SCALE) for direction in ('left', 'right')]
+    )
 
 
 class Game:
-    def __init__(self, width, height, fps = 60, num_levels = 1, participant_id = "UNKNOWN", time_per_hallway=50, enemy_speed=500, assistant_type="mixed") -> None:
+    def __init__(self, width, height, fps = 60, num_levels = 1, participant_id = "UNKNOWN", time_per_hallway=50, enemy_speed=session.ENEMY_MOVE_DELAY, assistant_type="mixed",
+                 log_formats=("csv",), log_flush_interval=0, log_fsync=False, assets=None, on_first_frame=None,
+                 telemetry_channel=None, seed=None, data_dir="data", input_source=None, record_inputs=True,
+                 maze_bank=None, maze_band=None, profile=False, schedule_file=None,
+                 stop_event=None, swarm_size=0, maze_cols=None, maze_rows=None) -> None:
         pygame.init()
         self.width = width
         self.height = height
         self.participant_id = participant_id
         self.max_time = time_per_hallway
-        self.enemy_move_delay = enemy_speed
+        self.enemy_move_delay = enemy_speed  # ms between enemy steps, for the single enemy and the swarm alike
         self.assistant_type = assistant_type
         self.screen = pygame.display.set_mode((width, height))
-        self.clock = pygame.time.Clock()
+        self.renderer = LayeredRenderer(self.screen)
+        self.input = input_source or LiveInput()
         self.fps = fps
+        self.frame_stats = FrameStats(fps, clock=self.input.clock_ns)
         self.num_levels = num_levels    # then each block is 9 trials
-        self.image_filenames = [f for f in os.listdir('images/assistants') if f.endswith('.png')]
+        self.image_filenames = list_assistants()
+        self.on_first_frame = on_first_frame
+
+        # All session randomness (mazes, agent order, advice) comes from this seed, so a session can be replayed
+        self.seed = seed if seed is not None else random.SystemRandom().getrandbits(63)
+        self.rng = random.Random(self.seed)
+
+        # With a bank, hallways use pre-built mazes (optionally from one difficulty band) instead of generating them
+        self.maze_bank = MazeBank(maze_bank) if maze_bank else None
+        self.maze_band = maze_band
+        if self.maze_bank is not None and maze_band is not None:
+            self.maze_bank.band(maze_band)  # fail here, not at the first maze, if the band cannot be used
+        # Enemies per maze in swarm mode (see swarm.py); 0 keeps the single enemy
+        self.swarm_size = swarm_size
+        # Maze size in cells: the bank's if there is one, else as given, else the default for the mode
+        if self.maze_bank is not None:
+            bank_size = (self.maze_bank.num_cols, self.maze_bank.num_rows)
+            if (maze_cols or bank_size[0], maze_rows or bank_size[1]) != bank_size:
+                raise ValueError(f"{maze_bank} holds {bank_size[0]}x{bank_size[1]} mazes, not {maze_cols}x{maze_rows}")
+            maze_cols, maze_rows = bank_size
+        default_size = session.SWARM_MAZE_SIZE if swarm_size else session.MAZE_SIZE
+        self.maze_cols = maze_cols or default_size
+        self.maze_rows = maze_rows or default_size
+
+        # With a schedules file, agent order, advice, lies and peeks come from the participant's
+        # counterbalanced schedule instead of the seed
+        self.schedule = None
+        if schedule_file:
+            book = ScheduleBook(schedule_file)
+            if book.levels < num_levels:
+                raise ValueError(f"{schedule_file} has {book.levels} hallways per schedule, {num_levels} needed")
+            missing = set(book.agents) - set(self.image_filenames)
+            if missing:
+                raise ValueError(f"{schedule_file} uses agents not in images/assistants: {sorted(missing)}")
+            self.schedule = book.for_participant(participant_id)
+
+        # Decode and scale every image up front so no PNG work happens between trials; with a
+        # built assets.bundle there is no decoding at all, only a conversion per image
+        self.assistant_scale = ASSISTANT_SCALE
+        self.bubble_scale = BUBBLE_SCALE
+        self.assets = assets or AssetManager(bundle=open_bundle())
+        self.assets.preload(asset_requests(width, height, self.image_filenames))
 
         # Game stats
         self.max_health = 100
@@ -30,196 +101,60 @@ class Game:
         self.max_time = 130  # seconds per hallway
         self.time_remaining = self.max_time * 1000  # milliseconds
         self.font = pygame.font.SysFont("Arial", 28)
+        self.text = TextCache()  # labels only change about once a second, so most frames are cache hits
 
-        os.makedirs("data", exist_ok=True)
-        self.logfile = open(f"data/{self.participant_id}_trials.csv", "a", newline="")
-        self.logwriter = csv.writer(self.logfile)
-
-        # Write header if it's a new file
-        if os.stat(f"data/{self.participant_id}_trials.csv").st_size == 0:
-            self.logwriter.writerow([
-                "timestamp", "participant_id", "hallway", "trial", "agent_image",
-                "correct_door", "player_choice", "correct", "health_after", "time_remaining"
-            ])
+        # Rows are written from a background thread so a slow disk never stalls a frame
+        self.logger = TrialLogger(
+            f"{data_dir}/{self.participant_id}_trials", TRIAL_FIELDS,
+            formats=log_formats, flush_interval=log_flush_interval, fsync=log_fsync
+        )
+        self.event_logger = TrialLogger(
+            f"{data_dir}/{self.participant_id}_events", EVENT_FIELDS,
+            formats=log_formats, flush_interval=log_flush_interval, fsync=log_fsync
+        )
+        self.recorder = None
+        if record_inputs:
+            self.recorder = InputRecorder(f"{data_dir}/{self.participant_id}_inputs.bin", {
+                "participant_id": participant_id, "seed": self.seed, "width": width, "height": height, "fps": fps,
+                "num_levels": num_levels, "time_per_hallway": time_per_hallway, "enemy_speed": enemy_speed,
+                "assistant_type": assistant_type, "maze_bank": maze_bank, "maze_band": maze_band,
+                "schedule_file": schedule_file, "swarm_size": swarm_size,
+                "maze_cols": self.maze_cols, "maze_rows": self.maze_rows,
+            })
+        # F3 toggles the frame overlay at any time; `profile` also traces the whole session to a file
+        self.profiler = FrameProfiler(f"{data_dir}/{self.participant_id}_trace.json" if profile else None, overlay=profile)
+        # The control server sets this (a multiprocessing.Event) to end the session cleanly at the next frame
+        self.stop_event = stop_event
+        self.scheduler = Scheduler(self)
+        self.latest_decision = None
+        self.telemetry = Telemetry(telemetry_channel, snapshot=self._telemetry_snapshot)
 
     def run(self):
-        hallway_image = pygame.image.load('images/hallway.png')
-        hallway_image = pygame.transform.scale(hallway_image, (self.width, self.height))
-        shrink_factor = 0.68
-
+        self.start_time = self.input.get_ticks()
         self.time_remaining = self.max_time * 1000
-        game_start_time = pygame.time.get_ticks()
-        # --- MAIN LOOP: 3 Hallways --- #
-        for level in range(self.num_levels):
-            print(f"\n=== Entering Hallway {level + 1} ===")
-
-            # 1️⃣ Pac-Man Maze first
-            self._run_trial()
-
-            # After maze, start hallway phase
-            randomized_filenames = deepcopy(self.image_filenames)
-            random.shuffle(randomized_filenames)
-
-            #self.time_remaining = self.max_time * 1000
-            #hallway_start_time = pygame.time.get_ticks()
-            #peek_trials = random.sample(range(1, 10), 3)
-            #print(f"Peek trials for hallway {level + 1}: {peek_trials}")
-
-            for trial_index, filename in enumerate(randomized_filenames[:9], start=1):
-                print(f"\nAgent {trial_index}/9 in Hallway {level + 1}")
-                pygame.event.clear()  # clear leftovers
-
-                assistant_scale = 0.68   # your perfect size
-                bubble_scale = 0.11      # adjust if you want smaller or bigger bubbles
-
-                assistant_image = pygame.image.load(f"images/assistants/{filename}")
-                assistant_image = pygame.transform.scale(
-                    assistant_image,
-                    (
-                        int(assistant_image.get_width() * assistant_scale),
-                        int(assistant_image.get_height() * assistant_scale)
-                    )
-                )
-
-                direction = random.choice(['left', 'right'])
-                text_bubble_image = pygame.image.load(f"images/{direction}-speech-bubble.png")
-                text_bubble_image = pygame.transform.scale(
-                    text_bubble_image,
-                    (
-                        int(text_bubble_image.get_width() * bubble_scale),
-                        int(text_bubble_image.get_height() * bubble_scale)
-                    )
-                )
-
-
-                correct_door = random.choice(['left', 'right'])
-                show_hallway = True
-
-                #if trial_index in peek_trials:
-                 #   print(f"Hint shown for agent {trial_index} (correct door: {correct_door})")
-                  #  self._show_hint(correct_door)
-
-                # --- HALLWAY LOOP (until choice made or time up) --- #
-                while show_hallway:
-                    dt = self.clock.tick(self.fps)
-                    #self.time_remaining -= dt
-                    elapsed_time = pygame.time.get_ticks() - game_start_time
-                    self.time_remaining = (self.max_time*1000) - elapsed_time
-
-                    self.screen.blit(hallway_image, (0, 0))
-                    self.screen.blit(
-                        assistant_image,
-                        (self.width // 2 - assistant_image.get_width() // 2,
-                         self.height // 2 - assistant_image.get_height() // 2)
-                    )
-                    self.screen.blit(
-                        text_bubble_image,
-                        (self.width // 2 - text_bubble_image.get_width() // 2,
-                         self.height // 2 - text_bubble_image.get_height() - assistant_image.get_height() // 2)
-                    )
-
-                    self._draw_health_bar()
-                    self._draw_timer_bar()
-
-                    #timer ran out
-                    if self.time_remaining <= 0:
-                        self._game_over("You have to be quicker!")
-                        return
-
-                    for event in pygame.event.get():
-                        if event.type == pygame.QUIT:
-                            close_game()
-
-                        if event.type == pygame.KEYDOWN:
-                            if event.key == pygame.K_LEFT:
-                                self._flash_choice("left")
-                                self._log_decision(level, trial_index, "left", correct_door, filename)
-                                if correct_door != 'left':
-                                    self._update_health(-5)
-                                show_hallway = False
-
-                            elif event.key == pygame.K_RIGHT:
-                                self._flash_choice("right")
-                                self._log_decision(level, trial_index, "right", correct_door, filename)
-                                if correct_door != 'right':
-                                    self._update_health(-5)
-                                show_hallway = False
-
-                            elif event.key == pygame.K_x:
-                                self._show_x_ray()
-
-                    if self.health <= 0:
-                        self._game_over("You ran out of health!")
-                        return
-
-                    pygame.display.update()
-
-            print(f"Completed Hallway {level + 1}")   # hallway finished
-
-            # Short pause / transition before next maze
-            if level < self.num_levels - 1:  # if not the last hallway
-                self._hallway_complete_screen(level + 1)
-            else:
-                print("All hallways completed successfully!")
-                self._final_victory_screen()
-                return
-
-        # After all 3 hallways done
-        #print(" All hallways completed successfully!")
-        #self._game_over("All hallways completed! Great job.")
-
-
-
+        self._log_event(time.perf_counter_ns(), "session", "seed", self.seed)
+        if self.recorder is not None:
+            self.recorder.start(self.start_time)
+        try:
+            # --- MAIN LOOP: each hallway is a maze followed by its agents --- #
+            self.scheduler.run(MazeScene(self, 0), on_first_frame=self.on_first_frame)
+        finally:
+            self.logger.close()
+            self.event_logger.close()
+            if self.recorder is not None:
+                self.recorder.close()
+            self.profiler.close({"participant_id": self.participant_id, "seed": self.seed})
+
+        if self.scheduler.quit_requested:
+            close_game()
         pygame.quit()
 
-    def _run_trial(self):
-        maze = Maze(self.screen)
-        player = Player(maze)
-        enemy = Enemy(maze, player)
-        enemy_move_time = pygame.time.get_ticks()
-        enemy_move_delay = 300 # milliseconds
-        enemy_is_active = False
-
-        while True:
-            self.screen.fill("black")
-
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    close_game()
-
-            if (player.x, player.y) == maze.goal:
-                print('Goal reached!')
-                return
-            else:
-                player.move()
-                if (player.x, player.y) != (0, 0) and not enemy_is_active:
-                    # Player moved - start the enemy
-                    enemy_is_active = True
-                    enemy_move_time = pygame.time.get_ticks()
-
-                maze.draw()
-                player.draw()
-
-                if enemy_is_active:
-                    if (pygame.time.get_ticks() - enemy_move_time) > enemy_move_delay:
-                        try:
-                            enemy.move()
-                        except IndexError:
-                            print('Player was caught!')
-                            self._game_over("The enemy caught you!")
-                            close_game()
-                        enemy_move_time = pygame.time.get_ticks()
-                    enemy.draw()
-
-            pygame.display.update()
-            self.clock.tick(self.fps)
-
     def _update_health(self, delta):
         self.health = max(0, min(self.max_health, self.health + delta))
         print(f"Health updated: {self.health}")
-    """"
+
     def _show_hint(self, correct_door):
-        #Briefly shows which door is correct.
+        """Peek trial: the hallway with the correct door outlined, shown for session.PEEK_MS before the agent."""
         hint_color = (0, 100, 255)  # blue hint color
         width = 200
         height = 400
@@ -230,13 +165,13 @@ class Game:
         else:
             x = self.width - width - 80
 
+        self.screen.blit(self.assets.get('images/hallway.png', (self.width, self.height)), (0, 0))
         pygame.draw.rect(self.screen, hint_color, (x, y, width, height), 6)
         pygame.display.update()
-        pygame.time.delay(1500)  # show for 2 seconds
-    """
 
 
     def _draw_health_bar(self):
+        """Draws the health bar and its label, returning the screen area they cover."""
         bar_width = 300
         bar_height = 25
         x, y = 40, 40
@@ -245,10 +180,12 @@ class Game:
         pygame.draw.rect(self.screen, (0, 255, 0), (x, y, fill, bar_height))
         pygame.draw.rect(self.screen, (255, 255, 255), (x, y, bar_width, bar_height), 2)
 
-        text = self.font.render(f"Health: {int(self.health)}", True, (255, 255, 255))
-        self.screen.blit(text, (x, y - 30))
+        text = self.text.render(self.font, f"Health: {int(self.health)}", (255, 255, 255))
+        text_rect = self.screen.blit(text, (x, y - 30))
+        return text_rect.union((x, y, bar_width, bar_height))
 
     def _draw_timer_bar(self):
+        """Draws the timer bar and its label, returning the screen area they cover."""
         bar_width = 300
         bar_height = 25
         x, y = 460, 40
@@ -257,45 +194,40 @@ class Game:
         pygame.draw.rect(self.screen, (0, 0, 0), (x, y, bar_width, bar_height))
         pygame.draw.rect(self.screen, (255, 255, 0), (x, y, fill, bar_height))
         pygame.draw.rect(self.screen, (255, 255, 255), (x, y, bar_width, bar_height), 2)
-        text = self.font.render(f"Time Left: {int(self.time_remaining / 1000)}s", True, (255, 255, 255))
-        self.screen.blit(text, (x, y - 30))
+        text = self.text.render(self.font, f"Time Left: {int(self.time_remaining / 1000)}s", (255, 255, 255))
+        text_rect = self.screen.blit(text, (x, y - 30))
+        return text_rect.union((x, y, bar_width, bar_height))
 
     def _game_over(self, message):
-        """Show a Game Over screen and reset."""
+        """Show a Game Over screen."""
         self.screen.fill((0, 0, 0))
-        text1 = self.font.render("GAME OVER", True, (255, 0, 0))
-        text2 = self.font.render(message, True, (255, 255, 255))
+        text1 = self.text.render(self.font, "GAME OVER", (255, 0, 0))
+        text2 = self.text.render(self.font, message, (255, 255, 255))
         self.screen.blit(text1, (self.width // 2 - text1.get_width() // 2, self.height // 2 - 40))
         self.screen.blit(text2, (self.width // 2 - text2.get_width() // 2, self.height // 2 + 10))
         pygame.display.update()
-        pygame.time.delay(3000)
         print(message)
-        self.health = self.max_health
-        self.time_remaining = self.max_time * 1000
 
     def _hallway_complete_screen(self, next_hallway_number):
         """Show short message before next hallway begins."""
         self.screen.fill((0, 0, 0))
-        msg = self.font.render(f"Hallway complete!", True, (0, 255, 0))
-        next_msg = self.font.render(f"Entering Hallway {next_hallway_number + 1}...", True, (255, 255, 255))
+        msg = self.text.render(self.font, f"Hallway complete!", (0, 255, 0))
+        next_msg = self.text.render(self.font, f"Entering Hallway {next_hallway_number + 1}...", (255, 255, 255))
         self.screen.blit(msg, (self.width // 2 - msg.get_width() // 2, self.height // 2 - 30))
         self.screen.blit(next_msg, (self.width // 2 - next_msg.get_width() // 2, self.height // 2 + 10))
         pygame.display.update()
-        pygame.time.delay(2000)
         print(f"Transitioning to Hallway {next_hallway_number + 1}")
 
     def _final_victory_screen(self):
         """Display the final completion message."""
         self.screen.fill((0, 0, 0))
-        text1 = self.font.render("🎉 ALL HALLWAYS COMPLETED! 🎉", True, (0, 255, 0))
-        text2 = self.font.render("Great job!", True, (255, 255, 255))
+        text1 = self.text.render(self.font, "🎉 ALL HALLWAYS COMPLETED! 🎉", (0, 255, 0))
+        text2 = self.text.render(self.font, "Great job!", (255, 255, 255))
         self.screen.blit(text1, (self.width // 2 - text1.get_width() // 2, self.height // 2 - 40))
         self.screen.blit(text2, (self.width // 2 - text2.get_width() // 2, self.height // 2 + 10))
         pygame.display.update()
-        pygame.time.delay(3000)
         print("All hallways complete – exiting game.")
-        pygame.quit()
-        sys.exit()
+        print(f"Text cache: {self.text.stats()}")
 
     def _flash_choice(self, choice):
         flash_color = (0, 255, 0)
@@ -319,33 +251,53 @@ class Game:
             6
         )
         pygame.display.update()
-        pygame.time.delay(250)
 
 
-    def _log_decision(self, hallway, trial, choice, correct_door, agent_filename):
-        correct = (choice == correct_door)
+    def _log_decision(self, hallway, trial, choice, advised_door, correct_door, agent_filename, response_ns, peek=False):
+        stats = self.frame_stats
+        onset_ns = stats.onset_ns if stats.onset_ns is not None else response_ns
+        self.latest_decision = {
+            "hallway": hallway + 1, "trial": trial, "agent_image": agent_filename, "advised_door": advised_door,
+            "choice": choice, "correct": choice == correct_door,
+            "reaction_time_ms": round((response_ns - onset_ns) / 1_000_000, 1),
+        }
 
         timestamp = datetime.datetime.now().isoformat()
-        self.logwriter.writerow([
-            timestamp,
-            self.participant_id,
-            hallway + 1,
-            trial,
-            agent_filename,
-            correct_door,
-            choice,
-            correct,
-            self.health,
-            round(self.time_remaining / 1000, 2)
+        self.logger.log(session.trial_row(
+            timestamp, self.participant_id, hallway, trial, agent_filename, advised_door, correct_door, choice,
+            self.health, self.time_remaining, onset_ns, response_ns, stats.frames, stats.dropped, stats.worst_frame_ns,
+            peek=peek
+        ))
+
+
+    def _telemetry_snapshot(self):
+        scene = self.scheduler.scene
+        level = getattr(scene, "level", None)
+        return {
+            "participant_id": self.participant_id,
+            "scene": scene.name if scene is not None else None,
+            "hallway": level + 1 if level is not None else None,
+            "num_levels": self.num_levels,
+            "trial": getattr(scene, "trial_index", None),
+            "health": self.health,
+            "time_remaining": round(self.time_remaining / 1000, 1),
+            "latest_decision": self.latest_decision,
+        }
+
+    def _log_event(self, event_ns, scene, event, key, hallway=None, trial=None):
+        self.event_logger.log([
+            event_ns, self.participant_id, scene,
+            hallway + 1 if hallway is not None else "", trial if trial is not None else "", event, key
         ])
-        self.logfile.flush()
-
 
     def _show_x_ray(self):
-        pygame.draw.rect(self.screen, (210, 74, 210), (80, 80, 100, 400))
-        pygame.draw.rect(self.screen, (100, 54, 100), (680, 80, 100, 400))
+        return [
+            pygame.draw.rect(self.screen, (210, 74, 210), (80, 80, 100, 400)),
+            pygame.draw.rect(self.screen, (100, 54, 100), (680, 80, 100, 400)),
+        ]
 
 def close_game():
+    # Open trial loggers drain themselves at exit
     print('Closing game...')
     pygame.quit()
     sys.exit()
@@ -356,7 +308,14 @@ def main():
     # Pacman
     # 10 assistants
     # Maze
-    Game(800, 800, num_levels=3).run()
+    def first_frame():
+        # From loading this module to the first maze on screen; interpreter start-up and unpacking the frozen app come on top
+        cold_start_ms = round((time.perf_counter() - STARTED_AT) * 1000)
+        game._log_event(time.perf_counter_ns(), "session", "cold_start_ms", cold_start_ms)
+        print(f"Cold start: {cold_start_ms} ms to first frame")
+
+    game = Game(800, 800, num_levels=3, profile="--profile" in sys.argv, on_first_frame=first_frame)
+    game.run()
     print('----------------------SCRIPT COMPLETE----------------------')
 
 
@@ -1,16 +1,18 @@
 # -*- mode: python ; coding: utf-8 -*-
+# Run `python assetbundle.py` first: the game maps assets.bundle instead of decoding PNGs at start-up.
+# images/ still ships for the assistant list and for anything the bundle does not cover.
 
 
 a = Analysis(
     ['main.py'],
     pathex=[],
     binaries=[],
-    datas=[],
+    datas=[('assets.bundle', '.'), ('images', 'images')],
     hiddenimports=[],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
-    excludes=[],
+    excludes=['flask', 'werkzeug', 'jinja2', 'api', 'workers', 'ids', 'simulate', 'bench'],
     noarchive=False,
     optimize=0,
 )
@@ -1,100 +1,368 @@
+import heapq
 import random
 from collections import deque
+from itertools import compress, permutations
 
 import pygame
 
 
 class Maze:
-    def __init__(self, screen, complexity = 0, cell_size = 64) -> None:
+    def __init__(self, screen, complexity = 0, cell_size = 64, num_cols = 12, num_rows = 12, seed = None, grid = None, goal = None) -> None:
+        """
+        Builds a maze on a flat bytearray grid (1 = wall, 0 = path) indexed as `y * num_cols + x`.
+
+        Cells sit on even coordinates and are joined by carving out the odd cells between them.
+        `complexity` (0-1) is the share of the walls left after carving that are knocked through
+        to add loops: 0 gives a perfect maze, higher values give fewer dead ends and more escape routes.
+        Passing a prebuilt `grid` (and its `goal`), e.g. from a `mazebank.MazeBank`, skips generation.
+        """
         self.screen = screen
-        self.num_cols = 12
-        self.num_rows = 12
-        screen_w = screen.get_width()
-        screen_h = screen.get_height()
-
-        self.cell_size = min(
-            screen_w // self.num_cols,
-            screen_h // self.num_rows
-        )
+        self.num_cols = num_cols
+        self.num_rows = num_rows
+        self.complexity = complexity
+        self.rng = random.Random(seed)
+
+        if screen is not None:
+            self.cell_size = max(1, min(
+                screen.get_width() // self.num_cols,
+                screen.get_height() // self.num_rows
+            ))
+            self.offset_x = (screen.get_width() - self.num_cols * self.cell_size) // 2
+            self.offset_y = (screen.get_height() - self.num_rows * self.cell_size) // 2
+        else:
+            self.cell_size = cell_size
+            self.offset_x = self.offset_y = 0
 
-        self.grid = [[1 for _ in range(self.num_cols)] for _ in range(self.num_rows)]  # 1 = wall, 0 = path
+        self._padded = None
+        self._graph = None
         self.start = (0, 0)
 
-        # Generate maze using DFS
-        stack = []
-        start_x, start_y = 0, 0
-        self.grid[start_y][start_x] = 0
-        stack.append((start_x, start_y))
-
-        directions = [(0, -2), (0, 2), (-2, 0), (2, 0)]  # Up, Down, Left, Right
-
-        while stack:
-            x, y = stack[-1]
-            random.shuffle(directions)
-            for dx, dy in directions:
-                nx, ny = x + dx, y + dy
-                if 0 <= nx < self.num_cols and 0 <= ny < self.num_rows and self.grid[ny][nx] == 1:
-                    self.grid[y + dy // 2][x + dx // 2] = 0  # Remove wall
-                    self.grid[ny][nx] = 0
-                    stack.append((nx, ny))
+        if grid is not None:
+            self.grid = bytearray(grid)
+            self.goal = goal if goal is not None else self._get_furthest_point()
+        else:
+            self.grid = bytearray(b"\x01") * (self.num_cols * self.num_rows)
+            self._generate(complexity)
+
+        # Distance field rooted at a single target (normally the player), shared by every enemy
+        self._field = None
+        self._field_target = None
+
+        # Walls, paths and goal never change, so they are rendered once and blitted from here
+        self.layer = self._render_layer() if screen is not None else None
+
+    def _generate(self, complexity):
+        furthest = self._carve()
+        if complexity > 0:
+            self._add_loops(complexity)
+            self.goal = self._get_furthest_point()
+        else:
+            # Paths are unique in a perfect maze, so the deepest carve is also the BFS-furthest cell
+            self.goal = furthest
+
+    def _render_layer(self):
+        # One palette index per cell, scaled up by cell_size, instead of a draw call per cell
+        cells = bytearray(self.grid)
+        cells[self.goal[1] * self.num_cols + self.goal[0]] = 2
+        layer = pygame.image.frombuffer(bytes(cells), (self.num_cols, self.num_rows), "P")
+        layer.set_palette([(255, 255, 255), (0, 0, 0), (0, 0, 255)])
+        layer = pygame.transform.scale(layer, (self.num_cols * self.cell_size, self.num_rows * self.cell_size))
+        return layer.convert()
+
+    def draw(self):
+        """Blits the whole pre-rendered maze."""
+        self.screen.blit(self.layer, (self.offset_x, self.offset_y))
+
+    def redraw(self, rects):
+        """Restores the maze underneath the given screen rects, e.g. where actors were drawn last frame."""
+        for rect in rects:
+            area = rect.move(-self.offset_x, -self.offset_y)
+            self.screen.blit(self.layer, rect, area)
+
+    def cell_rect(self, x, y):
+        """Screen rect covered by a cell."""
+        return pygame.Rect(
+            self.offset_x + x * self.cell_size,
+            self.offset_y + y * self.cell_size,
+            self.cell_size,
+            self.cell_size
+        )
+
+    def is_walkable(self, x, y):
+        """Checks if a position is walkable."""
+        return 0 <= x < self.num_cols and 0 <= y < self.num_rows and self.grid[y * self.num_cols + x] == 0
+
+    def _carve(self):
+        """Carves a perfect maze with an iterative DFS and returns the deepest cell reached."""
+        cols = self.num_cols
+        lattice_w = (self.num_cols + 1) // 2
+        lattice_h = (self.num_rows + 1) // 2
+
+        # The DFS walks a lattice of cells padded with a visited border, so it needs no bounds checks
+        pad_w = lattice_w + 2
+        visited = bytearray(pad_w * (lattice_h + 2))
+        visited[:pad_w] = visited[-pad_w:] = b"\x01" * pad_w
+        visited[::pad_w] = visited[pad_w - 1::pad_w] = b"\x01" * (lattice_h + 2)
+
+        to_grid = [0] * len(visited)
+        for cy in range(lattice_h):
+            base = (cy + 1) * pad_w + 1
+            to_grid[base:base + lattice_w] = range(2 * cy * cols, 2 * cy * cols + 2 * lattice_w, 2)
+
+        # One random byte per step picks a direction order; the DFS takes exactly 2 * cells - 1 steps
+        orders = list(permutations((-pad_w, pad_w, -1, 1)))
+        order_for_byte = [orders[b % len(orders)] for b in range(256)]
+
+        start = (self.start[1] // 2 + 1) * pad_w + self.start[0] // 2 + 1
+        visited[start] = 1
+        self.grid[to_grid[start]] = 0
+        stack = [start]
+        furthest, depth = start, 1
+
+        for byte in self.rng.randbytes(2 * lattice_w * lattice_h):
+            cell = stack[-1]
+            for step in order_for_byte[byte]:
+                neighbour = cell + step
+                if not visited[neighbour]:
+                    visited[neighbour] = 1
+                    target = to_grid[neighbour]
+                    self.grid[target] = 0
+                    self.grid[(to_grid[cell] + target) >> 1] = 0  # Remove wall
+                    stack.append(neighbour)
+                    if len(stack) > depth:
+                        furthest, depth = neighbour, len(stack)
                     break
             else:
                 # If no valid moves were found, backtrack
                 stack.pop()
+                if not stack:
+                    break
 
-        self.goal = self._get_furthest_point()
+        index = to_grid[furthest]
+        return index % cols, index // cols
 
+    def _add_loops(self, complexity):
+        """Knocks out a `complexity` share of the remaining walls that separate two cells."""
+        cols = self.num_cols
+        last_x = 2 * ((self.num_cols + 1) // 2 - 1)
+        last_y = 2 * ((self.num_rows + 1) // 2 - 1)
 
-    def draw(self):
-        for y in range(self.num_rows):
-            for x in range(self.num_cols):
-                color = (255, 255, 255) if self.is_walkable(x, y) else (0, 0, 0)
-                offset_x = (self.screen.get_width() - self.num_cols * self.cell_size) // 2
-                offset_y = (self.screen.get_height() - self.num_rows * self.cell_size) // 2
-
-                pygame.draw.rect(
-                    self.screen,
-                    color,
-                    (
-                        offset_x + x * self.cell_size,
-                        offset_y + y * self.cell_size,
-                        self.cell_size,
-                        self.cell_size
-                    )
-                )
-
-
-        pygame.draw.rect(self.screen, (0, 0, 255), (offset_x + self.goal[0] * self.cell_size, offset_y + self.goal[1] * self.cell_size, self.cell_size, self.cell_size))
+        candidates = []
+        for y in range(last_y + 1):
+            row = y * cols
+            # Even rows hold the walls between horizontal neighbours, odd rows those between vertical ones
+            positions = range(row + 1, row + last_x, 2) if y % 2 == 0 else range(row, row + last_x + 1, 2)
+            candidates.extend(compress(positions, self.grid[positions.start:positions.stop:2]))
 
-    def is_walkable(self, x, y):
-        """Checks if a position is walkable."""
-        return 0 <= x < self.num_cols and 0 <= y < self.num_rows and self.grid[y][x] == 0
+        for index in self.rng.sample(candidates, round(min(1, complexity) * len(candidates))):
+            self.grid[index] = 0
 
 
-    def _get_furthest_point(self):
-        # TODO: Code could be refactored to combine with other BFS, but leaving as is for now
-        visited = set()
-        queue = deque([(self.start[0], self.start[1], 0)])  # (x, y, distance)
+    def distance_field(self, target):
+        """Returns a distance field to `target` (see `distances_from`), rebuilt only when `target` changes."""
+        if target != self._field_target:
+            self._field = self.distances_from(target)
+            self._field_target = target
+        return self._field
+
+    def distance_to(self, field, x, y):
+        """Looks up the distance of a cell in a field from `distance_field`, -1 for walls and out-of-bounds cells."""
+        if not self.is_walkable(x, y):
+            return -1
+        source, dist = field
+        distance = self.graph.cell_distance(dist, source, (y + 1) * (self.num_cols + 2) + x + 1)
+        return distance if distance < UNREACHABLE else -1
+
+    def step_towards(self, x, y, field):
+        """Returns the neighbour of (x, y) that is closest in `field`, or (x, y) itself if none is closer."""
+        best = (x, y)
+        best_distance = self.distance_to(field, x, y)
+
+        for dx, dy in [(1, 0), (-1, 0), (0, 1), (0, -1)]:
+            distance = self.distance_to(field, x + dx, y + dy)
+            if distance != -1 and (best_distance == -1 or distance < best_distance):
+                best = (x + dx, y + dy)
+                best_distance = distance
+
+        return best
+
+    def padded_grid(self):
+        """The grid surrounded by a one-cell wall border, so searches can step without bounds checks."""
+        if self._padded is None:
+            cols = self.num_cols
+            padded_cols = cols + 2
+            self._padded = bytearray(b"\x01") * (padded_cols * (self.num_rows + 2))
+            for y in range(self.num_rows):
+                row = (y + 1) * padded_cols + 1
+                self._padded[row:row + cols] = self.grid[y * cols:(y + 1) * cols]
+        return self._padded
+
+    @property
+    def graph(self):
+        """The maze's `JunctionGraph`, built on first use."""
+        if self._graph is None:
+            padded_cols = self.num_cols + 2
+            start = (self.start[1] + 1) * padded_cols + self.start[0] + 1
+            self._graph = JunctionGraph(self.padded_grid(), padded_cols, start)
+        return self._graph
+
+    def distances_from(self, source):
+        """
+        Distances from `source` to every junction and dead end, for `distance_to` and `step_towards`
+        to resolve any cell through the corridor it lies on.
+        """
+        if not self.is_walkable(*source):
+            return 0, [UNREACHABLE] * len(self.graph.nodes)  # padded index 0 is border wall
+        index = (source[1] + 1) * (self.num_cols + 2) + source[0] + 1
+        return index, self.graph.distances(index)
+
+    def path_length(self, source, target):
+        """Steps on the shortest path between two cells, -1 if there is none."""
+        return self.distance_to(self.distances_from(source), *target)
+
+    def furthest_from(self, source):
+        """The cell furthest from `source` (the first in row order on ties) and its distance."""
+        index, distance = self.graph.furthest(*self.distances_from(source))
+        padded_cols = self.num_cols + 2
+        return (index % padded_cols - 1, index // padded_cols - 1), distance
 
-        farthest_point = self.start
-        max_distance = 0
+    def eccentricity(self, cell):
+        """Distance from `cell` to the cell furthest away from it."""
+        return self.furthest_from(cell)[1]
+
+    def _get_furthest_point(self):
+        """
+        The cell furthest from the start, first in row order on ties, as `furthest_from(self.start)`.
+        A single flat BFS is cheaper than building the junction graph, which routing may never need.
+        """
+        grid = self.padded_grid()
+        padded_cols = self.num_cols + 2
+        dist = [-1] * len(grid)
+        start = (self.start[1] + 1) * padded_cols + self.start[0] + 1
+        dist[start] = 0
+        queue = deque([start])
 
         while queue:
-            x, y, distance = queue.popleft()
+            index = queue.popleft()
+            next_distance = dist[index] + 1
+            for neighbour in (index + 1, index - 1, index + padded_cols, index - padded_cols):
+                if not grid[neighbour] and dist[neighbour] == -1:
+                    dist[neighbour] = next_distance
+                    queue.append(neighbour)
+        index = dist.index(max(dist))
+        return index % padded_cols - 1, index // padded_cols - 1
+
+
+UNREACHABLE = 1 << 60
+OPEN_CELLS = bytes.maketrans(b"\x00\x01", b"\x01\x00")  # grid.translate(OPEN_CELLS) flags the open cells
+
+
+class JunctionGraph:
+    """
+    A maze contracted to its junctions, dead ends and start cell, joined by the corridors between
+    them weighted by length. Searches only visit nodes; a corridor cell is resolved from the two
+    nodes at its ends. Works on padded grid indexes (see `Maze.padded_grid`).
+    """
 
-            if (x, y) in visited:
+    def __init__(self, grid, padded_cols, start):
+        steps = (1, -1, padded_cols, -padded_cols)
+        size = len(grid)
+        self.node_at = node_at = [-1] * size
+        self.nodes = []     # padded index of each node
+        self.degree = []    # open neighbours of each node
+        for index in compress(range(size), grid.translate(OPEN_CELLS)):
+            degree = (not grid[index + 1]) + (not grid[index - 1]) + (not grid[index + padded_cols]) + (not grid[index - padded_cols])
+            if degree != 2 or index == start:
+                node_at[index] = len(self.nodes)
+                self.nodes.append(index)
+                self.degree.append(degree)
+
+        self.edge_at = edge_at = [-1] * size   # corridor each corridor cell lies on
+        self.offset_at = offset_at = [0] * size  # steps from the corridor's first node
+        self.edges = []         # (first node, second node, length)
+        self.edge_cells = []    # corridor cells in order from the first node
+        self.adjacency = [[] for _ in self.nodes]
+        for a, origin in enumerate(self.nodes):
+            for step in steps:
+                cell = origin + step
+                if grid[cell] or edge_at[cell] >= 0 or (node_at[cell] >= 0 and node_at[cell] < a):
+                    continue  # wall, or a corridor already walked from its other end
+                cells = []
+                prev = origin
+                while node_at[cell] < 0:
+                    cells.append(cell)
+                    edge_at[cell] = len(self.edges)
+                    offset_at[cell] = len(cells)
+                    for step_on in steps:
+                        if cell + step_on != prev and not grid[cell + step_on]:
+                            break
+                    prev, cell = cell, cell + step_on
+                b = node_at[cell]
+                self.edges.append((a, b, len(cells) + 1))
+                self.edge_cells.append(cells)
+                self.adjacency[a].append((b, len(cells) + 1))
+                self.adjacency[b].append((a, len(cells) + 1))
+
+    def distances(self, source):
+        """Dijkstra from the cell at padded index `source`; returns the distance to every node."""
+        dist = [UNREACHABLE] * len(self.nodes)
+        node = self.node_at[source]
+        if node >= 0:
+            heap = [(0, node)]
+        else:
+            a, b, length = self.edges[self.edge_at[source]]
+            offset = self.offset_at[source]
+            heap = [(offset, a), (length - offset, b)]
+        for distance, node in heap:
+            dist[node] = min(dist[node], distance)
+        heapq.heapify(heap)
+
+        adjacency = self.adjacency
+        while heap:
+            distance, node = heapq.heappop(heap)
+            if distance > dist[node]:
                 continue
-            visited.add((x, y))
+            for neighbour, length in adjacency[node]:
+                next_distance = distance + length
+                if next_distance < dist[neighbour]:
+                    dist[neighbour] = next_distance
+                    heapq.heappush(heap, (next_distance, neighbour))
+        return dist
 
-            # If this point is further than the current farthest point, update
-            if distance > max_distance:
-                max_distance = distance
-                farthest_point = (x, y)
+    def cell_distance(self, dist, source, index):
+        """Distance to the cell at padded `index`, given node distances `dist` from `source`."""
+        node = self.node_at[index]
+        if node >= 0:
+            return dist[node]
+        edge = self.edge_at[index]
+        a, b, length = self.edges[edge]
+        offset = self.offset_at[index]
+        distance = min(dist[a] + offset, dist[b] + length - offset)
+        if self.edge_at[source] == edge:
+            distance = min(distance, abs(offset - self.offset_at[source]))  # straight along the shared corridor
+        return distance
 
-            # Explore neighbors
-            for dx, dy in [(1, 0), (-1, 0), (0, 1), (0, -1)]:
-                nx, ny = x + dx, y + dy
-                if self.is_walkable(nx, ny) and (nx, ny) not in visited:
-                    queue.append((nx, ny, distance + 1))
+    def furthest(self, source, dist):
+        """(padded index, distance) of the reachable cell furthest from `source`, lowest index on ties."""
+        best_distance, best_index = -1, 0
+        for node, index in enumerate(self.nodes):
+            if best_distance < dist[node] < UNREACHABLE or (dist[node] == best_distance and index < best_index):
+                best_distance, best_index = dist[node], index
 
-        return farthest_point
+        source_edge = self.edge_at[source]
+        for edge, (a, b, length) in enumerate(self.edges):
+            cells = self.edge_cells[edge]
+            if not cells or (dist[a] >= UNREACHABLE and dist[b] >= UNREACHABLE):
+                continue
+            if edge == source_edge:
+                offsets = range(1, length)
+            else:
+                # Distance rises from both ends towards where the two routes meet, so only the peak can win
+                peak = (dist[b] + length - dist[a]) // 2
+                offsets = {min(max(offset, 1), length - 1) for offset in (peak, peak + 1)}
+            for offset in offsets:
+                index = cells[offset - 1]
+                distance = self.cell_distance(dist, source, index)
+                if distance > best_distance or (distance == best_distance and index < best_index):
+                    best_distance, best_index = distance, index
+        return best_index, best_distance
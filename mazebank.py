@@ -0,0 +1,174 @@
+"""
+Offline bank of pre-generated mazes.
+
+All mazes share one file: a header, a fixed-size index entry per maze, then the bit-packed grids.
+Mazes are stored in order of difficulty (shortest path, then dead ends), so a difficulty band is a
+contiguous range of IDs, and reading any maze is a slice of the memory-mapped file.
+
+    python mazebank.py --count 10000 --complexity 0 --complexity 0.1 --out mazes/bank.bin
+"""
+import argparse
+import mmap
+import os
+import random
+import struct
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+from maze import Maze
+
+MAGIC = b"RJVAMAZE"
+_HEADER = struct.Struct("<8sIHHI")      # magic, count, num_cols, num_rows, bytes per packed grid
+_ENTRY = struct.Struct("<QdHHIId")      # seed, complexity, goal x, goal y, path length, dead ends, branching
+ENTRY_FIELDS = ("seed", "complexity", "goal_x", "goal_y", "path_length", "dead_ends", "branching")
+
+# bytes(grid) of 0/1 cells <-> the ASCII digits int() and format() work with
+_TO_DIGITS = bytes.maketrans(b"\x00\x01", b"01")
+_FROM_DIGITS = bytes.maketrans(b"01", b"\x00\x01")
+BANDS = 3  # difficulty bands a bank is split into
+
+
+def pack_grid(grid, grid_bytes):
+    return int(bytes(grid).translate(_TO_DIGITS), 2).to_bytes(grid_bytes, "big")
+
+
+def unpack_grid(data, cells):
+    return bytearray(format(int.from_bytes(data, "big"), f"0{cells}b").encode().translate(_FROM_DIGITS))
+
+
+def maze_stats(maze):
+    """
+    (path_length, dead_ends, branching) for a maze: steps from start to goal, dead-end cells, and
+    side openings per step along shortest paths (wrong turns on offer), read off the junction graph.
+    """
+    graph = maze.graph
+    start, from_start = maze.distances_from(maze.start)
+    goal, from_goal = maze.distances_from(maze.goal)
+    path_length = maze.distance_to((start, from_start), *maze.goal)
+
+    # Corridor cells offer no choice, so only junctions on the path add side openings
+    side_openings = 0
+    for node, index in enumerate(graph.nodes):
+        if index != goal and from_start[node] + from_goal[node] == path_length:
+            side_openings += graph.degree[node] - (1 if index == start else 2)  # the start cell has no way in
+    return path_length, graph.degree.count(1), side_openings / max(1, path_length)
+
+
+def _build_chunk(jobs):
+    entries = []
+    for seed, complexity, num_cols, num_rows, grid_bytes in jobs:
+        maze = Maze(None, complexity=complexity, num_cols=num_cols, num_rows=num_rows, seed=seed)
+        path_length, dead_ends, branching = maze_stats(maze)
+        entry = (seed, complexity, maze.goal[0], maze.goal[1], path_length, dead_ends, branching)
+        entries.append((entry, pack_grid(maze.grid, grid_bytes)))
+    return entries
+
+
+def build(path, count, num_cols=12, num_rows=12, complexities=(0,), seed=0, workers=None, chunk_size=200):
+    """Generates `count` mazes across a process pool, cycling through `complexities`, and writes the bank."""
+    grid_bytes = (num_cols * num_rows + 7) // 8
+    seeds = random.Random(seed)
+    jobs = [(seeds.getrandbits(64), complexities[n % len(complexities)], num_cols, num_rows, grid_bytes)
+            for n in range(count)]
+    chunks = [jobs[i:i + chunk_size] for i in range(0, len(jobs), chunk_size)]
+
+    entries = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for chunk in pool.map(_build_chunk, chunks):
+            entries.extend(chunk)
+    entries.sort(key=lambda item: (item[0][4], item[0][5], item[0][0]))
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, count, num_cols, num_rows, grid_bytes))
+        f.write(b"".join(_ENTRY.pack(*entry) for entry, _ in entries))
+        f.write(b"".join(grid for _, grid in entries))
+
+
+class MazeBank:
+    """Read-only view of a bank file; IDs run from 0 (easiest) to len(bank) - 1 (hardest)."""
+
+    def __init__(self, path, bands=BANDS):
+        self.path = path
+        self.bands = bands
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count, self.num_cols, self.num_rows, self.grid_bytes = _HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a maze bank")
+        self._grids_at = _HEADER.size + self.count * _ENTRY.size
+
+    def __len__(self):
+        return self.count
+
+    def entry(self, maze_id):
+        """The index entry of a maze as a dict of ENTRY_FIELDS."""
+        self._check(maze_id)
+        return dict(zip(ENTRY_FIELDS, _ENTRY.unpack_from(self._map, _HEADER.size + maze_id * _ENTRY.size)))
+
+    def grid(self, maze_id):
+        self._check(maze_id)
+        start = self._grids_at + maze_id * self.grid_bytes
+        return unpack_grid(self._map[start:start + self.grid_bytes], self.num_cols * self.num_rows)
+
+    def load(self, screen, maze_id):
+        """A ready `Maze` for a bank entry; nothing is generated or searched."""
+        entry = self.entry(maze_id)
+        return Maze(screen, complexity=entry["complexity"], num_cols=self.num_cols, num_rows=self.num_rows,
+                    seed=entry["seed"], grid=self.grid(maze_id), goal=(entry["goal_x"], entry["goal_y"]))
+
+    def band(self, band):
+        """The range of IDs in difficulty band `band` of the bank's `bands` equal bands (0 = easiest)."""
+        if isinstance(band, bool) or not isinstance(band, int):
+            raise TypeError(f"Band must be an integer, not {band!r}")
+        bands = self.bands
+        if not 0 <= band < bands:
+            raise ValueError(f"Band {band} is outside 0..{bands - 1}")
+        if self.count < bands:
+            raise ValueError(f"{self.path} has {self.count} mazes, too few for {bands} difficulty bands")
+        return range(band * self.count // bands, (band + 1) * self.count // bands)
+
+    def pick(self, rng, band=None):
+        """A random maze ID from `band`, or from the whole bank if `band` is None."""
+        ids = range(self.count) if band is None else self.band(band)
+        return rng.choice(ids)
+
+    def close(self):
+        self._map.close()
+
+    def _check(self, maze_id):
+        if not 0 <= maze_id < self.count:
+            raise IndexError(f"Maze {maze_id} is not in {self.path} ({self.count} mazes)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--count", type=int, default=10000)
+    parser.add_argument("--cols", type=int, default=12)
+    parser.add_argument("--rows", type=int, default=12)
+    parser.add_argument("--complexity", type=float, action="append", help="repeat to mix loop densities")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--out", default="mazes/bank.bin")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    build(args.out, args.count, args.cols, args.rows, args.complexity or [0], args.seed, args.workers)
+    elapsed = time.perf_counter() - start
+
+    bank = MazeBank(args.out)
+    print(f"Built {len(bank)} mazes in {elapsed:.1f}s -> {args.out} ({os.path.getsize(args.out)} bytes)")
+    # Every band has at least one maze once there are as many mazes as bands
+    for band in range(bank.bands if len(bank) >= bank.bands else 0):
+        ids = bank.band(band)
+        lengths = [bank.entry(maze_id)["path_length"] for maze_id in (ids[0], ids[-1])]
+        print(f"  band {band}: mazes {ids.start}-{ids.stop - 1}, path length {lengths[0]}-{lengths[1]}")
+    bank.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+import json
+import os
+import time
+from collections import deque
+
+import pygame
+
+
+class FrameProfiler:
+    """
+    Times the phases of each frame (events, update, drawing, display update, ...) as the scheduler and
+    scenes call `lap` after each one. F3 toggles an overlay with rolling p50/p95/p99 frame times and
+    per-phase means; with a `trace_path`, every frame of the session is kept and written there as
+    Chrome trace-event JSON (open in chrome://tracing or Perfetto) on `close`.
+
+    While neither is on, every call returns after a single attribute check. Turning the overlay on
+    mid-frame starts timing at the next `begin_frame`, so no frame is measured from a stale start.
+    """
+
+    OVERLAY_REFRESH_NS = 250_000_000  # re-render the overlay text four times a second
+
+    def __init__(self, trace_path=None, overlay=False, window=300):
+        self.trace_path = trace_path
+        self.overlay = overlay
+        self.enabled = overlay or trace_path is not None
+        self.timing = False  # the current frame started while enabled
+        self.window = window
+        self.intervals_ns = deque(maxlen=window)  # present to present, what the participant sees
+        self.work_ns = deque(maxlen=window)       # time spent in the frame, excluding the tick wait
+        self.phases_ns = {}
+        self._trace = []   # (name, start ns, duration ns); duration None for instant events
+        self._frame_start = self._lap_start = self._last_end = 0
+        self._font = None
+        self._panel = None
+        self._panel_rect = None
+        self._panel_due = 0
+
+    def toggle_overlay(self, screen):
+        self.overlay = not self.overlay
+        self.enabled = self.overlay or self.trace_path is not None
+        self.timing = self.timing and self.enabled
+        self._last_end = 0
+        if not self.overlay and self._panel_rect is not None:
+            # The screen surface never keeps the panel (see `_draw_overlay`), so showing it again clears it
+            pygame.display.update(self._panel_rect)
+            self._panel = self._panel_rect = None
+
+    def begin_frame(self):
+        self.timing = self.enabled
+        if not self.enabled:
+            return
+        self._frame_start = self._lap_start = time.perf_counter_ns()
+
+    def lap(self, name):
+        """Attributes the time since the previous lap (or the frame start) to phase `name`."""
+        if not self.timing:
+            return
+        now = time.perf_counter_ns()
+        duration = now - self._lap_start
+        samples = self.phases_ns.get(name)
+        if samples is None:
+            samples = self.phases_ns[name] = deque(maxlen=self.window)
+        samples.append(duration)
+        if self.trace_path is not None:
+            self._trace.append((name, self._lap_start, duration))
+        self._lap_start = now
+
+    def mark(self, name):
+        """An instant event in the trace, e.g. a scene switch."""
+        if self.enabled and self.trace_path is not None:
+            self._trace.append((name, time.perf_counter_ns(), None))
+
+    def end_frame(self, screen):
+        if not self.timing:
+            return
+        now = time.perf_counter_ns()
+        self.work_ns.append(now - self._frame_start)
+        if self._last_end:
+            self.intervals_ns.append(now - self._last_end)
+        self._last_end = now
+        if self.trace_path is not None:
+            self._trace.append(("frame", self._frame_start, now - self._frame_start))
+        if self.overlay:
+            self._draw_overlay(screen, now)
+
+    @staticmethod
+    def percentiles(samples_ns):
+        """(p50, p95, p99) in ms, nearest rank."""
+        if not samples_ns:
+            return 0.0, 0.0, 0.0
+        ordered = sorted(samples_ns)
+        last = len(ordered) - 1
+        return tuple(ordered[round(p * last)] / 1e6 for p in (0.5, 0.95, 0.99))
+
+    def _draw_overlay(self, screen, now):
+        shown = self._panel_rect
+        if self._panel is None or now >= self._panel_due:
+            self._panel = self._render_panel()
+            self._panel_due = now + self.OVERLAY_REFRESH_NS
+            self._panel_rect = self._panel.get_rect(topright=(screen.get_width() - 4, 4))
+        rect = self._panel_rect
+        shown = rect if shown is None else rect.union(shown)  # a panel that shrank also uncovers its old area
+        # Drawn every frame over whatever the scene drew, shown, then taken off the screen surface again:
+        # scenes that only redraw what changed never find it there, and it never goes stale underneath
+        underneath = screen.subsurface(rect).copy()
+        screen.blit(self._panel, rect)
+        pygame.display.update(shown)
+        screen.blit(underneath, rect)
+
+    def _render_panel(self):
+        if self._font is None:
+            self._font = pygame.font.SysFont("monospace", 14)
+        lines = [
+            "frame p50 {:5.1f} p95 {:5.1f} p99 {:5.1f} ms".format(*self.percentiles(self.intervals_ns)),
+            "work  p50 {:5.1f} p95 {:5.1f} p99 {:5.1f} ms".format(*self.percentiles(self.work_ns)),
+        ] + [
+            f"  {name:<10} {sum(samples) / len(samples) / 1e6:6.2f} ms" for name, samples in self.phases_ns.items()
+        ]
+        rendered = [self._font.render(line, True, (255, 255, 255)) for line in lines]
+        panel = pygame.Surface((max(r.get_width() for r in rendered) + 8, sum(r.get_height() for r in rendered) + 8))
+        panel.fill((0, 0, 0))
+        y = 4
+        for surface in rendered:
+            panel.blit(surface, (4, y))
+            y += surface.get_height()
+        return panel
+
+    def close(self, metadata=None):
+        """Writes the collected trace, if any; safe to call more than once."""
+        if self.trace_path is None or not self._trace:
+            return
+        origin = self._trace[0][1]
+        pid = os.getpid()
+        events = [
+            {"name": name, "ph": "X", "ts": (start - origin) / 1000, "dur": duration / 1000, "pid": pid, "tid": 0}
+            if duration is not None else
+            {"name": name, "ph": "i", "s": "t", "ts": (start - origin) / 1000, "pid": pid, "tid": 0}
+            for name, start, duration in self._trace
+        ]
+        directory = os.path.dirname(self.trace_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.trace_path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms", "otherData": metadata or {}}, f)
+        self._trace = []
@@ -0,0 +1,52 @@
+import pygame
+
+
+class LayeredRenderer:
+    """Composites a static scene once and refreshes only the regions that change on top of it."""
+
+    def __init__(self, screen):
+        self.screen = screen
+        self.background = pygame.Surface(screen.get_size()).convert()
+        self._dirty = []
+        self._transient = []
+        self._regions = {}
+
+    def compose(self, layers):
+        """Blits (surface, position) layers into the cached background and shows it on the next present."""
+        self.background.fill((0, 0, 0))
+        for surface, position in layers:
+            self.background.blit(surface, position)
+        self.screen.blit(self.background, (0, 0))
+        self._dirty = [self.screen.get_rect()]
+        self._transient = []
+        self._regions = {}
+
+    def restore(self, rect):
+        """Puts the static scene back underneath `rect`."""
+        self.screen.blit(self.background, rect, rect)
+
+    def begin_frame(self):
+        """Wipes anything that was only meant to be shown for a single frame."""
+        for rect in self._transient:
+            self.restore(rect)
+        self._dirty.extend(self._transient)
+        self._transient = []
+
+    def refresh(self, name, draw):
+        """Redraws a named region over a clean background; `draw` paints it and returns the rect it covered."""
+        previous = self._regions.get(name)
+        if previous is not None:
+            self.restore(previous)
+        rect = draw()
+        self._regions[name] = rect
+        self.mark(rect.union(previous) if previous is not None else rect)
+
+    def mark(self, rect, transient=False):
+        """Queues `rect` for the next present; transient rects are restored again on the following frame."""
+        self._dirty.append(pygame.Rect(rect))
+        if transient:
+            self._transient.append(pygame.Rect(rect))
+
+    def present(self):
+        pygame.display.update(self._dirty)
+        self._dirty = []
@@ -0,0 +1,215 @@
+"""
+Record and replay of sessions.
+
+Every session writes `{participant_id}_inputs.bin` next to its CSVs: a JSON header with the
+settings and RNG seed, then one record per frame (the game-clock step) followed by the key events
+polled in that frame. Game logic only reads the game clock, the seeded RNG and these events, so
+feeding them back reproduces the session, headless and at up to `--speed` times real time.
+
+    python replay.py data/P-00001_inputs.bin --speed 100
+"""
+import argparse
+import csv
+import json
+import os
+import struct
+import sys
+import time
+
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import pygame
+
+MAGIC = b"RJVAREC\x01"
+_HEADER_LEN = struct.Struct("<I")
+
+# Record tags; the payload size follows from the tag
+FRAME, FRAME_LONG, KEYDOWN, KEYUP, QUIT = range(5)
+_FRAME = struct.Struct("<BH")       # game-clock step in ms since the previous frame
+_FRAME_LONG = struct.Struct("<BI")  # the same, for steps that do not fit 16 bits (e.g. a stalled window)
+_KEY = struct.Struct("<Bi")         # pygame key code
+_QUIT = struct.Struct("<B")
+_RECORDS = {FRAME: _FRAME, FRAME_LONG: _FRAME_LONG, KEYDOWN: _KEY, KEYUP: _KEY, QUIT: _QUIT}
+
+# Columns that depend on wall-clock time or the machine rather than on game logic
+TIMING_FIELDS = {"timestamp", "onset_ns", "response_ns", "reaction_time_ms", "dropped_frames", "worst_frame_ms"}
+
+
+class InputRecorder:
+    """Appends frames and their key events to the binary input log; `header` is stored as JSON."""
+
+    def __init__(self, path, header):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(path, "wb")
+        payload = json.dumps(header).encode()
+        self._file.write(MAGIC + _HEADER_LEN.pack(len(payload)) + payload)
+        self.last = 0
+
+    def start(self, now):
+        self.last = now
+
+    def frame(self, now, events):
+        dt = now - self.last
+        self.last = now
+        write = self._file.write
+        write(_FRAME.pack(FRAME, dt) if dt <= 0xFFFF else _FRAME_LONG.pack(FRAME_LONG, dt))
+        for event in events:
+            if event.type == pygame.KEYDOWN:
+                write(_KEY.pack(KEYDOWN, event.key))
+            elif event.type == pygame.KEYUP:
+                write(_KEY.pack(KEYUP, event.key))
+            elif event.type == pygame.QUIT:
+                write(_QUIT.pack(QUIT))
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+
+def read_recording(path):
+    """Returns (header, frames) where each frame is (dt_ms, [(tag, key), ...])."""
+    with open(path, "rb") as f:
+        data = f.read()
+    if data[:len(MAGIC)] != MAGIC:
+        raise ValueError(f"{path} is not an input recording")
+    pos = len(MAGIC)
+    (length,) = _HEADER_LEN.unpack_from(data, pos)
+    pos += _HEADER_LEN.size
+    header = json.loads(data[pos:pos + length])
+    pos += length
+
+    frames = []
+    while pos < len(data):
+        record = _RECORDS.get(data[pos])
+        if record is None:
+            raise ValueError(f"Unknown record tag {data[pos]} at byte {pos} of {path}")
+        if pos + record.size > len(data):
+            break  # cut off mid-record, e.g. the process was killed
+        tag, *value = record.unpack_from(data, pos)
+        pos += record.size
+        if tag in (FRAME, FRAME_LONG):
+            frames.append((value[0], []))
+        else:
+            frames[-1][1].append((tag, value[0] if value else None))
+    return header, frames
+
+
+class RecordedInput:
+    """
+    Stands in for `scenes.LiveInput`: the game clock advances by the recorded steps and each poll
+    returns that frame's events. `speed` caps playback at that multiple of real time (0 for no cap).
+    When the recording runs out, a QUIT ends the session.
+    """
+
+    clock_ns = staticmethod(time.perf_counter_ns)
+
+    def __init__(self, frames, speed=100):
+        self.frames = iter(frames)
+        self.speed = speed
+        self.now = 0
+        self.events = []
+        self._started = None
+
+    def tick(self, fps):
+        frame = next(self.frames, None)
+        if frame is None:
+            self.events = [pygame.event.Event(pygame.QUIT)]
+            return 0
+        dt, events = frame
+        self.now += dt
+        self.events = [
+            pygame.event.Event(pygame.QUIT) if tag == QUIT
+            else pygame.event.Event(pygame.KEYDOWN if tag == KEYDOWN else pygame.KEYUP, key=key)
+            for tag, key in events
+        ]
+        if self.speed:
+            if self._started is None:
+                self._started = time.perf_counter() - self.now / 1000 / self.speed
+            ahead = self._started + self.now / 1000 / self.speed - time.perf_counter()
+            if ahead > 0:
+                time.sleep(ahead)
+        return dt
+
+    def get_ticks(self):
+        return self.now
+
+    def poll(self):
+        pygame.event.pump()  # keep the dummy window's own queue from filling up
+        events, self.events = self.events, []
+        return events
+
+
+def compare_trials(original_path, replay_path):
+    """Differences between two trials CSVs on the logic columns, as readable strings; empty if they match."""
+    with open(original_path, newline="") as f:
+        original = list(csv.DictReader(f))
+    with open(replay_path, newline="") as f:
+        replayed = list(csv.DictReader(f))
+
+    diffs = []
+    if len(original) != len(replayed):
+        diffs.append(f"{len(original)} trials recorded, {len(replayed)} replayed")
+    for row, (a, b) in enumerate(zip(original, replayed), start=1):
+        for field in a:
+            if field not in TIMING_FIELDS and a[field] != b.get(field):
+                diffs.append(f"row {row} {field}: recorded {a[field]!r}, replayed {b.get(field)!r}")
+    return diffs
+
+
+def replay(recording_path, speed=100, out_dir="data/replay", original=None):
+    """
+    Re-runs a recorded session headless into `out_dir` and compares its trials CSV with `original`
+    (by default the CSV next to the recording). Returns the list of differences.
+    """
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    from main import Game
+
+    header, frames = read_recording(recording_path)
+    participant_id = header["participant_id"]
+    if original is None:
+        original = os.path.join(os.path.dirname(recording_path), f"{participant_id}_trials.csv")
+    replayed = os.path.join(out_dir, f"{participant_id}_trials.csv")
+    for suffix in ("_trials.csv", "_events.csv"):
+        stale = os.path.join(out_dir, participant_id + suffix)
+        if os.path.exists(stale):
+            os.remove(stale)  # loggers append, so clear what an earlier replay left behind
+
+    game = Game(
+        header["width"], header["height"], fps=header["fps"], num_levels=header["num_levels"],
+        participant_id=participant_id, time_per_hallway=header["time_per_hallway"],
+        enemy_speed=header["enemy_speed"], assistant_type=header["assistant_type"], seed=header["seed"],
+        maze_bank=header.get("maze_bank"), maze_band=header.get("maze_band"), schedule_file=header.get("schedule_file"),
+        swarm_size=header.get("swarm_size", 0), maze_cols=header.get("maze_cols"), maze_rows=header.get("maze_rows"),
+        data_dir=out_dir, input_source=RecordedInput(frames, speed), record_inputs=False,
+    )
+    try:
+        game.run()
+    except SystemExit:
+        pass  # the recording ended in a window close
+    return compare_trials(original, replayed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("recording", help="a data/{participant_id}_inputs.bin file")
+    parser.add_argument("--speed", type=float, default=100, help="playback cap as a multiple of real time, 0 for none")
+    parser.add_argument("--out", default="data/replay")
+    parser.add_argument("--original", help="trials CSV to compare against (default: next to the recording)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    diffs = replay(args.recording, args.speed, args.out, args.original)
+    print(f"Replayed {args.recording} in {time.perf_counter() - start:.1f}s")
+    if diffs:
+        print(f"{len(diffs)} difference(s) from the recorded session:")
+        for diff in diffs:
+            print(f"  {diff}")
+        sys.exit(1)
+    print("Trials match the recorded session")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,358 @@
+import time
+
+import pygame
+
+import session
+from actors import Enemy, Player
+from maze import Maze
+from swarm import Swarm
+
+
+class LiveInput:
+    """
+    The real frame clock and event queue; replay swaps in `replay.RecordedInput` and the simulator
+    `simulate.ScriptedInput`, with the same methods.
+    """
+
+    clock_ns = staticmethod(time.perf_counter_ns)  # stamps key events and frame presentation
+
+    def __init__(self):
+        self.clock = pygame.time.Clock()
+
+    def tick(self, fps):
+        return self.clock.tick(fps)
+
+    def get_ticks(self):
+        return pygame.time.get_ticks()
+
+    def poll(self):
+        return pygame.event.get()
+
+
+class Scheduler:
+    """
+    Runs one scene at a time at the game's frame rate. Every frame it pumps the event queue,
+    forwards events to the current scene, updates it and switches to whatever scene it hands back.
+    Nothing blocks, so the window keeps responding during pauses and transitions.
+    Time and input both come from `game.input`, and each frame is handed to `game.recorder`
+    when there is one, so a session can be replayed exactly. Setting `game.stop_event` ends the
+    session at the start of the next frame, leaving `Game.run` to close the logs as usual.
+    """
+
+    def __init__(self, game):
+        self.game = game
+        self.input = game.input
+        self.recorder = game.recorder
+        self.profiler = game.profiler
+        self.stop_event = game.stop_event
+        self.scene = None
+        self.now = 0
+        self.quit_requested = False
+        self.stop_requested = False
+
+    def run(self, scene, on_first_frame=None):
+        self.now = self.game.start_time
+        self._switch(scene)
+        if on_first_frame is not None:
+            on_first_frame()  # entering the first scene has put its first frame on screen
+        profiler = self.profiler
+        stop_event = self.stop_event
+        while self.scene is not None:
+            frame_ms = self.input.tick(self.game.fps)
+            self.now = self.input.get_ticks()
+            if stop_event is not None and stop_event.is_set():
+                self.stop_requested = True
+                self.game._log_event(time.perf_counter_ns(), "session", "stopped", self.scene.name)
+                return
+            profiler.begin_frame()
+
+            events = self.input.poll()
+            events_ns = self.input.clock_ns()  # pygame events carry no timestamp, so stamp the poll
+            if self.recorder is not None:
+                self.recorder.frame(self.now, events)
+            for event in events:
+                if event.type == pygame.QUIT:
+                    self.quit_requested = True
+                    return
+                if event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                    profiler.toggle_overlay(self.game.screen)
+                    continue
+                self.scene.handle_event(event, events_ns)
+            profiler.lap("events")
+
+            next_scene = self.scene.update(self.now)
+            if next_scene is not self.scene:
+                self._switch(next_scene)
+            profiler.lap("update")
+            if self.scene is not None:
+                self.scene.draw()
+            self.game.telemetry.frame(self.now, frame_ms)
+            profiler.lap("telemetry")
+            profiler.end_frame(self.game.screen)
+
+    def _switch(self, scene):
+        self.scene = scene
+        if scene is not None:
+            self.profiler.mark(f"enter {scene.name}")
+            scene.enter(self.now)
+
+
+class Scene:
+    name = "scene"
+
+    def __init__(self, game):
+        self.game = game
+        self.next_scene = self
+
+    def enter(self, now):
+        """Called once when the scene becomes current."""
+
+    def handle_event(self, event, event_ns):
+        pass
+
+    def update(self, now):
+        """Returns the scene to show next: itself to stay, another scene, or None to end the session."""
+        return self.next_scene
+
+    def draw(self):
+        pass
+
+
+class TimedScene(Scene):
+    """
+    Shows a still screen for `duration` ms, then hands over to `next_scene`. Key presses that
+    arrive meanwhile are logged to the events file instead of being dropped.
+    """
+
+    def __init__(self, game, name, duration, render, next_scene, level=None, trial=None):
+        super().__init__(game)
+        self.name = name
+        self.duration = duration
+        self.render = render
+        self.then = next_scene
+        self.level = level
+        self.trial = trial
+        self.ends_at = 0
+
+    def enter(self, now):
+        self.ends_at = now + self.duration
+        self.render()
+
+    def handle_event(self, event, event_ns):
+        if event.type == pygame.KEYDOWN:
+            self.game._log_event(event_ns, self.name, "ignored_keydown", pygame.key.name(event.key), self.level, self.trial)
+
+    def update(self, now):
+        return self.then if now >= self.ends_at else self
+
+
+def game_over(game, message):
+    return TimedScene(game, "game_over", 3000, lambda: game._game_over(message), None)
+
+
+class MazeScene(Scene):
+    name = "maze"
+
+    def __init__(self, game, level):
+        super().__init__(game)
+        self.level = level
+
+    def enter(self, now):
+        print(f"\n=== Entering Hallway {self.level + 1} ===")
+        bank = self.game.maze_bank
+        if bank is not None:
+            maze_id = bank.pick(self.game.rng, self.game.maze_band)
+            self.maze = bank.load(self.game.screen, maze_id)
+            self.game._log_event(time.perf_counter_ns(), self.name, "maze_id", maze_id, self.level)
+        else:
+            self.maze = Maze(self.game.screen, num_cols=self.game.maze_cols, num_rows=self.game.maze_rows,
+                             seed=self.game.rng.getrandbits(64))
+        self.player = Player(self.maze, now)
+        # Swarm mode: the single enemy is replaced by many, spread over the maze and moved as a batch
+        self.enemy = self.swarm = None
+        if self.game.swarm_size:
+            self.swarm = Swarm(self.maze, self.player, self.game.swarm_size, self.game.rng, now, self.game.enemy_move_delay)
+        else:
+            self.enemy = Enemy(self.maze, self.player, now, self.game.enemy_move_delay)
+        self.enemy_is_active = False
+
+        # Full frame once; afterwards only the cells the actors leave or enter are refreshed
+        self.game.screen.fill("black")
+        self.maze.draw()
+        if self.swarm is not None:
+            self.swarm.draw_all()
+        self.player.draw()
+        pygame.display.update()
+        self.drawn_rects = [self.player.rect]
+        self.drawn_cell = (self.player.x, self.player.y)
+
+    def handle_event(self, event, event_ns):
+        self.player.handle_event(event, event_ns, self.game.scheduler.now)
+
+    def update(self, now):
+        player, enemy = self.player, self.enemy
+        for event_ns, event, key in player.input_log:
+            self.game._log_event(event_ns, self.name, event, key, self.level)
+        player.input_log.clear()
+
+        if (player.x, player.y) == self.maze.goal:
+            print('Goal reached!')
+            game = self.game
+            if game.schedule is not None:
+                trials = iter(game.schedule[self.level])
+            else:
+                trials = session.hallway_trials(game.rng, game.image_filenames)
+            return hallway_trial(game, self.level, trials)
+
+        player.move(now)
+        if (player.x, player.y) != (0, 0) and not self.enemy_is_active:
+            # Player moved - start the enemy
+            self.enemy_is_active = True
+            if self.swarm is not None:
+                self.swarm.start(now)
+            else:
+                enemy.last_move_time = now
+
+        if self.enemy_is_active:
+            hunter = self.swarm if self.swarm is not None else enemy
+            hunter.move(now)
+            if hunter.has_caught(player):
+                print('Player was caught!')
+                return game_over(self.game, "The enemy caught you!")
+        return self
+
+    def draw(self):
+        if self.swarm is not None:
+            self._draw_swarm()
+            return
+        actor_rects = [self.player.rect, self.enemy.rect] if self.enemy_is_active else [self.player.rect]
+        if actor_rects != self.drawn_rects:
+            profiler = self.game.profiler
+            self.maze.redraw(self.drawn_rects)
+            self.player.draw()
+            if self.enemy_is_active:
+                self.enemy.draw()
+            profiler.lap("maze_draw")
+            pygame.display.update(self.drawn_rects + actor_rects)
+            profiler.lap("present")
+            self.drawn_rects = actor_rects
+
+    def _draw_swarm(self):
+        player = self.player
+        cell = (player.x, player.y)
+        # Where the player was is restored along with the cells enemies left, then refilled
+        also = [self.swarm.index(*self.drawn_cell)] if cell != self.drawn_cell else []
+        rects = self.swarm.draw(also)
+        if rects:
+            profiler = self.game.profiler
+            player.draw()
+            rects.append(player.rect)
+            profiler.lap("maze_draw")
+            pygame.display.update(rects)
+            profiler.lap("present")
+            self.drawn_cell = cell
+
+
+def hallway_trial(game, level, trials):
+    """The scene for the next agent in this hallway, or what follows the hallway once all agents are done."""
+    trial = next(trials, None)
+    if trial is not None:
+        scene = HallwayScene(game, level, trials, *trial)
+        if scene.peek:
+            return TimedScene(
+                game, "peek", session.PEEK_MS, lambda: game._show_hint(scene.correct_door), scene,
+                level=level, trial=scene.trial_index
+            )
+        return scene
+
+    print(f"Completed Hallway {level + 1}")   # hallway finished
+    if level < game.num_levels - 1:
+        # Short pause / transition before next maze
+        return TimedScene(
+            game, "hallway_complete", session.HALLWAY_TRANSITION_MS,
+            lambda: game._hallway_complete_screen(level + 1), MazeScene(game, level + 1), level=level
+        )
+    print("All hallways completed successfully!")
+    return TimedScene(game, "victory", 3000, game._final_victory_screen, None, level=level)
+
+
+class HallwayScene(Scene):
+    name = "hallway"
+
+    def __init__(self, game, level, trials, trial_index, filename, direction, correct_door, peek=False):
+        super().__init__(game)
+        self.level = level
+        self.trials = trials
+        self.trial_index = trial_index
+        self.filename = filename
+        self.direction = direction
+        self.correct_door = correct_door
+        self.peek = peek
+
+    def enter(self, now):
+        game = self.game
+        print(f"\nAgent {self.trial_index}/{session.TRIALS_PER_HALLWAY} in Hallway {self.level + 1}")
+        hallway_image = game.assets.get('images/hallway.png', (game.width, game.height))
+        assistant_image = game.assets.get(f"images/assistants/{self.filename}", game.assistant_scale)
+        text_bubble_image = game.assets.get(f"images/{self.direction}-speech-bubble.png", game.bubble_scale)
+
+        game.renderer.compose([
+            (hallway_image, (0, 0)),
+            (assistant_image,
+             (game.width // 2 - assistant_image.get_width() // 2,
+              game.height // 2 - assistant_image.get_height() // 2)),
+            (text_bubble_image,
+             (game.width // 2 - text_bubble_image.get_width() // 2,
+              game.height // 2 - text_bubble_image.get_height() - assistant_image.get_height() // 2)),
+        ])
+        game.frame_stats.reset()
+
+    def handle_event(self, event, event_ns):
+        if event.type != pygame.KEYDOWN:
+            return
+        if self.next_scene is not self:
+            # Decided earlier in this poll; later keys are logged like those of the flash that follows
+            self.game._log_event(event_ns, self.name, "ignored_keydown", pygame.key.name(event.key), self.level, self.trial_index)
+        elif event.key in (pygame.K_LEFT, pygame.K_RIGHT):
+            self._decide("left" if event.key == pygame.K_LEFT else "right", event_ns)
+        elif event.key == pygame.K_x:
+            for rect in self.game._show_x_ray():
+                self.game.renderer.mark(rect, transient=True)
+
+    def _decide(self, choice, event_ns):
+        game = self.game
+        game._log_decision(
+            self.level, self.trial_index, choice, self.direction, self.correct_door, self.filename, event_ns, self.peek
+        )
+        if self.correct_door != choice:
+            game._update_health(-session.WRONG_DOOR_PENALTY)
+        game.telemetry.publish(game.scheduler.now)
+
+        if game.health <= 0:
+            then = game_over(game, "You ran out of health!")
+        else:
+            then = hallway_trial(game, self.level, self.trials)
+        self.next_scene = TimedScene(
+            game, "choice_flash", session.FLASH_MS, lambda: game._flash_choice(choice), then,
+            level=self.level, trial=self.trial_index
+        )
+
+    def update(self, now):
+        game = self.game
+        game.time_remaining = (game.max_time * 1000) - (now - game.start_time)
+        #timer ran out
+        if self.next_scene is self and game.time_remaining <= 0:
+            return game_over(game, "You have to be quicker!")
+        return self.next_scene
+
+    def draw(self):
+        # Only the HUD changes between frames; the hallway, agent and bubble stay composited
+        renderer = self.game.renderer
+        profiler = self.game.profiler
+        renderer.begin_frame()
+        renderer.refresh("health", self.game._draw_health_bar)
+        renderer.refresh("timer", self.game._draw_timer_bar)
+        profiler.lap("hud")
+        renderer.present()
+        profiler.lap("present")
+        self.game.frame_stats.presented()
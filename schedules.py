@@ -0,0 +1,190 @@
+"""
+Counterbalanced trial schedules, generated offline and looked up by participant ID.
+
+Each participant gets, per hallway, the agent order, the advised door, whether the agent lies
+(the correct door is then the other one) and whether the trial starts with a peek behind the doors.
+Agent orders follow a Williams design, so every agent appears in every position and after every
+other agent equally often across participants; lies rotate over the agents, so each agent (and
+each appearance class) lies at the configured rate; advised doors are split evenly left/right.
+
+    python schedules.py generate --participants 720 --levels 3 --lie-rate 0.33 --peek-rate 0.11
+    python schedules.py check
+"""
+import argparse
+import json
+import os
+import random
+import re
+import struct
+from collections import Counter
+
+from assetbundle import list_assistants
+from session import DOORS, TRIALS_PER_HALLWAY
+
+MAGIC = b"RJVASCHD"
+_HEADER = struct.Struct("<8sIHHI")  # magic, participants, hallways, trials per hallway, metadata length
+ADVISED_RIGHT, LIES, PEEK = 1, 2, 4  # flag bits; each trial is stored as (agent index, flags)
+DEFAULT_PATH = "data/schedules.bin"
+
+
+def williams_orders(n):
+    """Rows of a Williams design for `n` items: 2n rows for odd n so that first-order carry-over balances."""
+    first = [0]
+    for step in range(1, n):
+        first.append((step + 1) // 2 if step % 2 else n - step // 2)
+    rows = [[(item + shift) % n for item in first] for shift in range(n)]
+    if n % 2:
+        rows += [row[::-1] for row in rows]
+    return rows
+
+
+def generate(participants, agents, levels=3, trials=TRIALS_PER_HALLWAY, lie_rate=0.33, peek_rate=0.0, seed=0):
+    """Schedules as [participant][hallway] -> [(agent_image, advised_door, lies, peek), ...]."""
+    n = len(agents)
+    if trials > n:
+        raise ValueError(f"{trials} trials per hallway need at least as many agents ({n} given)")
+    orders = williams_orders(n)
+    lies_per_hallway = round(lie_rate * trials)
+    peeks_per_hallway = round(peek_rate * trials)
+
+    schedules = []
+    for participant in range(participants):
+        rng = random.Random(f"{seed}:{participant}")
+        hallways = []
+        for level in range(levels):
+            order = orders[(participant + level) % len(orders)][:trials]
+            # Rotating which agents lie balances lying over agents across consecutive participants
+            rotation = (participant + level * lies_per_hallway) % n
+            liars = {(rotation + k) % n for k in range(lies_per_hallway)}
+            # Alternate which door gets the odd trial so left and right even out over participants
+            right = set(rng.sample(range(trials), trials // 2 + (participant + level) % 2 * (trials % 2)))
+            peeks = set(rng.sample(range(trials), peeks_per_hallway))
+            hallways.append([
+                (agents[agent], DOORS[position in right], agent in liars, position in peeks)
+                for position, agent in enumerate(order)
+            ])
+        schedules.append(hallways)
+    return schedules
+
+
+def write(path, schedules, agents, metadata):
+    levels, trials = len(schedules[0]), len(schedules[0][0])
+    index = {agent: code for code, agent in enumerate(agents)}
+    payload = json.dumps(dict(metadata, agents=agents)).encode()
+    records = bytearray()
+    for hallways in schedules:
+        for hallway in hallways:
+            for agent, advised_door, lies, peek in hallway:
+                records.append(index[agent])
+                records.append((advised_door == "right") * ADVISED_RIGHT | lies * LIES | peek * PEEK)
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, len(schedules), levels, trials, len(payload)))
+        f.write(payload)
+        f.write(records)
+
+
+class ScheduleBook:
+    """A schedules file; any participant's schedule is read at a fixed offset."""
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        with open(path, "rb") as f:
+            data = f.read()
+        magic, self.count, self.levels, self.trials, length = _HEADER.unpack_from(data, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a schedules file")
+        self.metadata = json.loads(data[_HEADER.size:_HEADER.size + length])
+        self.agents = self.metadata["agents"]
+        self._records = memoryview(data)[_HEADER.size + length:]
+        self._record_size = self.levels * self.trials * 2
+
+    def __len__(self):
+        return self.count
+
+    def slot(self, participant_id):
+        """The schedule a participant ID maps to: P-00001 is slot 0, wrapping around after the last one."""
+        match = re.search(r"(\d+)$", participant_id)
+        if match is None:
+            raise ValueError(f"Participant ID '{participant_id}' has no number to pick a schedule with")
+        return (int(match.group(1)) - 1) % self.count
+
+    def schedule(self, slot):
+        """[hallway] -> [(trial, agent_image, advised_door, correct_door, peek), ...] for one slot."""
+        start = slot * self._record_size
+        record = self._records[start:start + self._record_size]
+        hallways = []
+        for level in range(self.levels):
+            hallway = []
+            for position in range(self.trials):
+                agent, flags = record[2 * (level * self.trials + position):][:2]
+                advised_door = DOORS[bool(flags & ADVISED_RIGHT)]
+                correct_door = DOORS[1 - DOORS.index(advised_door)] if flags & LIES else advised_door
+                hallway.append((position + 1, self.agents[agent], advised_door, correct_door, bool(flags & PEEK)))
+            hallways.append(hallway)
+        return hallways
+
+    def for_participant(self, participant_id):
+        return self.schedule(self.slot(participant_id))
+
+    def check(self):
+        """Design counts over all slots, for a look before data collection starts."""
+        lies_by_agent, lies_by_class, shown_by_class = Counter(), Counter(), Counter()
+        position_counts = Counter()
+        advised = Counter()
+        peeks = 0
+        for slot in range(self.count):
+            for hallway in self.schedule(slot):
+                for trial, agent, advised_door, correct_door, peek in hallway:
+                    lies = advised_door != correct_door
+                    lies_by_agent[agent] += lies
+                    lies_by_class[agent[:1]] += lies
+                    shown_by_class[agent[:1]] += 1
+                    position_counts[agent, trial] += 1
+                    advised[advised_door] += 1
+                    peeks += peek
+        trials = self.count * self.levels * self.trials
+        per_position = [position_counts[agent, trial] for agent in self.agents for trial in range(1, self.trials + 1)]
+        return {
+            "slots": self.count,
+            "trials": trials,
+            "lie_rate": sum(lies_by_agent.values()) / trials,
+            "lie_rate_by_class": {c: lies_by_class[c] / shown_by_class[c] for c in sorted(shown_by_class)},
+            "lies_by_agent": dict(sorted(lies_by_agent.items())),
+            "agent_position_counts": {"min": min(per_position), "max": max(per_position)},
+            "advised": dict(advised),
+            "peek_rate": peeks / trials,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("generate")
+    build.add_argument("--participants", type=int, default=720)
+    build.add_argument("--levels", type=int, default=3)
+    build.add_argument("--lie-rate", type=float, default=0.33)
+    build.add_argument("--peek-rate", type=float, default=0.0)
+    build.add_argument("--seed", type=int, default=0)
+    build.add_argument("--out", default=DEFAULT_PATH)
+    check = commands.add_parser("check")
+    check.add_argument("path", nargs="?", default=DEFAULT_PATH)
+    args = parser.parse_args()
+
+    if args.command == "generate":
+        agents = list_assistants()
+        schedules = generate(args.participants, agents, args.levels, TRIALS_PER_HALLWAY,
+                             args.lie_rate, args.peek_rate, args.seed)
+        write(args.out, schedules, agents, {"lie_rate": args.lie_rate, "peek_rate": args.peek_rate, "seed": args.seed})
+        print(f"Wrote {args.participants} schedules of {args.levels} hallways to {args.out} "
+              f"({os.path.getsize(args.out)} bytes)")
+        args.path = args.out
+
+    print(json.dumps(ScheduleBook(args.path).check(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
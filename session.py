@@ -0,0 +1,57 @@
+"""Trial rules and the trials CSV schema, shared by the pygame Game and the headless simulator."""
+
+DOORS = ("left", "right")
+TRIALS_PER_HALLWAY = 9
+WRONG_DOOR_PENALTY = 5
+PLAYER_MOVE_DELAY = 150     # milliseconds between player steps in the maze
+ENEMY_MOVE_DELAY = 300      # milliseconds between enemy steps in the maze
+FLASH_MS = 250              # choice highlight after a decision
+HALLWAY_TRANSITION_MS = 2000
+PEEK_MS = 1500              # how long a peek trial shows the correct door before the agent appears
+MAZE_SIZE = 12              # cells per side of a generated maze
+SWARM_MAZE_SIZE = 49        # the same in swarm mode, which needs room to spread its enemies out
+
+TRIAL_FIELDS = [
+    "timestamp", "participant_id", "hallway", "trial", "agent_image", "advised_door",
+    "correct_door", "player_choice", "correct", "health_after", "time_remaining",
+    "onset_ns", "response_ns", "reaction_time_ms", "frames", "dropped_frames", "worst_frame_ms",
+    "peek"
+]
+
+# Inputs that arrive while no decision is possible (choice flash, transitions, end screens)
+EVENT_FIELDS = ["event_ns", "participant_id", "scene", "hallway", "trial", "event", "key"]
+
+
+def hallway_trials(rng, image_filenames):
+    """Yields (trial, agent_image, advised_door, correct_door) for one hallway, drawing from `rng` as it goes."""
+    filenames = list(image_filenames)
+    rng.shuffle(filenames)
+    for trial, filename in enumerate(filenames[:TRIALS_PER_HALLWAY], start=1):
+        advised_door = rng.choice(DOORS)
+        correct_door = rng.choice(DOORS)
+        yield trial, filename, advised_door, correct_door
+
+
+def trial_row(timestamp, participant_id, hallway, trial, agent_image, advised_door, correct_door, choice,
+              health, time_remaining, onset_ns, response_ns, frames, dropped_frames, worst_frame_ns, peek=False):
+    """One trials CSV row in TRIAL_FIELDS order; `hallway` is 0-based and `time_remaining` in milliseconds."""
+    return [
+        timestamp,
+        participant_id,
+        hallway + 1,
+        trial,
+        agent_image,
+        advised_door,
+        correct_door,
+        choice,
+        choice == correct_door,
+        health,
+        round(time_remaining / 1000, 2),
+        onset_ns,
+        response_ns,
+        round((response_ns - onset_ns) / 1_000_000, 3),
+        frames,
+        dropped_frames,
+        round(worst_frame_ns / 1_000_000, 3),
+        peek
+    ]
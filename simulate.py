@@ -0,0 +1,243 @@
+"""
+Headless batch simulation of whole sessions with scripted participant policies.
+
+Runs `main.Game` itself, maze and hallway scenes included, on SDL's dummy video driver: the
+policy plays through `ScriptedInput`, which stands in for the keyboard and a virtual millisecond
+clock, so there are no real-time waits. Maze banks, schedules and swarm mode work as in the lab,
+and each session writes the usual trials and events CSVs.
+
+    python simulate.py --sessions 1000 --policy trust --policy trust-male-70 --policy random
+"""
+import argparse
+import contextlib
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pygame
+
+import session
+from actors import KEY_DIRECTIONS
+from main import Game
+
+DIRECTION_KEYS = {direction: key for key, direction in KEY_DIRECTIONS.items()}
+DOOR_KEYS = {"left": pygame.K_LEFT, "right": pygame.K_RIGHT}
+# Scene a session was in when it went to the game over screen, and what ended it
+OUTCOMES = {"maze": "caught", "hallway": "timeout", "choice_flash": "health"}
+
+
+class Policy:
+    """
+    A scripted participant. `trust` is the probability of following the agent's advice, optionally
+    overridden per appearance class (the F/M/N prefix of the agent image) through `trust_by_class`.
+    Reaction times are log-normal around `rt_median_ms`; in the maze the participant heads for the
+    goal by the shortest route, but takes a random turn instead with `wrong_turn_rate` at each cell.
+    """
+
+    def __init__(self, name, trust=0.5, trust_by_class=None, rt_median_ms=900, rt_sigma=0.35, wrong_turn_rate=0.1):
+        self.name = name
+        self.trust = trust
+        self.trust_by_class = trust_by_class or {}
+        self.rt_median_ms = rt_median_ms
+        self.rt_sigma = rt_sigma
+        self.wrong_turn_rate = wrong_turn_rate
+
+    def choose(self, rng, agent_image, advised_door):
+        trust = self.trust_by_class.get(agent_image[:1], self.trust)
+        if rng.random() < trust:
+            return advised_door
+        return session.DOORS[1 - session.DOORS.index(advised_door)]
+
+    def reaction_ms(self, rng):
+        return max(1, int(rng.lognormvariate(math.log(self.rt_median_ms), self.rt_sigma)))
+
+    def maze_step(self, rng, maze, position, goal_field):
+        if rng.random() < self.wrong_turn_rate:
+            x, y = position
+            options = [(x + dx, y + dy) for dx, dy in [(1, 0), (-1, 0), (0, 1), (0, -1)] if maze.is_walkable(x + dx, y + dy)]
+            return rng.choice(options)
+        return maze.step_towards(position[0], position[1], goal_field)
+
+
+POLICIES = {
+    "trust": Policy("trust", trust=1.0),
+    "distrust": Policy("distrust", trust=0.0),
+    "random": Policy("random", trust=0.5),
+    "trust-male-70": Policy("trust-male-70", trust=0.5, trust_by_class={"M": 0.7}),
+}
+
+
+def parse_policy(spec):
+    """
+    Looks up a named policy, or builds one from `name:CLASS=p,...`, e.g. `picky:M=0.7,F=0.4,default=0.5`.
+    """
+    if spec in POLICIES:
+        return POLICIES[spec]
+    name, _, rates = spec.partition(":")
+    if not rates:
+        raise ValueError(f"Unknown policy '{spec}'")
+    trust_by_class = {}
+    trust = 0.5
+    for item in filter(None, rates.split(",")):
+        key, _, value = item.partition("=")
+        if key == "default":
+            trust = float(value)
+        else:
+            trust_by_class[key] = float(value)
+    return Policy(name, trust=trust, trust_by_class=trust_by_class)
+
+
+class ScriptedInput:
+    """
+    Stands in for `scenes.LiveInput` with `policy` at the keys. Each tick advances a virtual game
+    clock by one frame, and each poll returns the key events the policy makes in that frame, looking
+    at the game's current scene: in a maze it holds the arrow key for its next step, in a hallway it
+    presses the chosen door once its reaction time has passed. Key events and frame presentation
+    are stamped on the same virtual clock, so reaction times in the trials CSV are the policy's.
+    """
+
+    def __init__(self, policy, rng):
+        self.policy = policy
+        self.rng = rng
+        self.game = None  # set once the Game exists
+        self.now = 0
+        self.frame_start = 0
+        self._elapsed = 0.0
+        self.scene = None
+        self.outcome = None
+        self.held = None         # arrow key down in the current maze
+        self.decided_at = None   # cell the policy last picked a step in
+        self.goal_field = None
+        self.press = None        # (game ms, key) of the coming door choice
+
+    def tick(self, fps):
+        self.frame_start = self.now
+        self._elapsed += 1000 / fps
+        dt = int(self._elapsed) - self.now
+        self.now += dt
+        return dt
+
+    def get_ticks(self):
+        return self.now
+
+    def clock_ns(self):
+        return self.now * 1_000_000
+
+    def poll(self):
+        scene = self.game.scheduler.scene
+        if scene is not self.scene:
+            self._enter(scene)
+        if scene.name == "maze":
+            return self._steer(scene)
+        if self.press is not None and self.now >= self.press[0]:
+            key = self.press[1]
+            self.press = None
+            return [pygame.event.Event(pygame.KEYDOWN, key=key)]
+        return []
+
+    def _enter(self, scene):
+        if scene.name == "game_over":
+            self.outcome = OUTCOMES[self.scene.name]
+        elif scene.name == "victory":
+            self.outcome = "completed"
+        elif scene.name == "maze":
+            self.held = self.decided_at = None
+            self.goal_field = scene.maze.distances_from(scene.maze.goal)
+        elif scene.name == "hallway":
+            # The agent went on screen in the frame the scene was entered
+            choice = self.policy.choose(self.rng, scene.filename, scene.direction)
+            self.press = (self.frame_start + self.policy.reaction_ms(self.rng), DOOR_KEYS[choice])
+        self.scene = scene
+
+    def _steer(self, scene):
+        maze, player = scene.maze, scene.player
+        cell = (player.x, player.y)
+        if cell == self.decided_at or cell == maze.goal:
+            return []
+        self.decided_at = cell
+        x, y = self.policy.maze_step(self.rng, maze, cell, self.goal_field)
+        key = DIRECTION_KEYS[x - cell[0], y - cell[1]]
+        if key == self.held:
+            return []
+        events = [pygame.event.Event(pygame.KEYUP, key=self.held)] if self.held is not None else []
+        events.append(pygame.event.Event(pygame.KEYDOWN, key=key))
+        self.held = key
+        return events
+
+
+def simulate_session(participant_id, policy, seed, num_levels=3, fps=60, out_dir="data/sim", **settings):
+    """
+    Runs one session and writes `{out_dir}/{participant_id}_trials.csv`; returns how it ended.
+    `settings` go to `Game` as they are (maze_bank, maze_band, schedule_file, swarm_size, ...).
+    """
+    # The game draws from `seed` exactly as a lab session with that seed would; the policy has its own stream
+    player = ScriptedInput(policy, random.Random(f"{seed}:{policy.name}"))
+    with open(os.devnull, "w") as quiet, contextlib.redirect_stdout(quiet):
+        game = Game(
+            800, 800, fps=fps, num_levels=num_levels, participant_id=participant_id, seed=seed,
+            data_dir=out_dir, input_source=player, record_inputs=False, log_flush_interval=60, **settings
+        )
+        player.game = game
+        game.run()
+    return player.outcome
+
+
+def _run_batch(jobs):
+    return [simulate_session(**job) for job in jobs]
+
+
+def run_batch(policies, sessions, num_levels=3, seed=0, workers=None, out_dir="data/sim", chunk_size=50, **settings):
+    """Simulates `sessions` participants per policy across a process pool; returns outcome counts per policy."""
+    seeds = random.Random(seed)
+    jobs = [
+        dict(participant_id=f"SIM-{policy.name}-{n:05d}", policy=policy, seed=seeds.getrandbits(64),
+             num_levels=num_levels, out_dir=out_dir, **settings)
+        for policy in policies for n in range(1, sessions + 1)
+    ]
+    chunks = [jobs[i:i + chunk_size] for i in range(0, len(jobs), chunk_size)]
+
+    outcomes = {policy.name: {} for policy in policies}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for chunk, results in zip(chunks, pool.map(_run_batch, chunks)):
+            for job, outcome in zip(chunk, results):
+                counts = outcomes[job["policy"].name]
+                counts[outcome] = counts.get(outcome, 0) + 1
+    return outcomes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=100, help="simulated participants per policy")
+    parser.add_argument("--policy", action="append", help=f"one of {', '.join(POLICIES)} or name:CLASS=p,...")
+    parser.add_argument("--levels", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--out", default="data/sim")
+    parser.add_argument("--maze-bank", help="play pre-built mazes from this bank (see mazebank.py)")
+    parser.add_argument("--maze-band", type=int, help="difficulty band of the bank to draw from")
+    parser.add_argument("--schedule-file", help="counterbalanced schedules to look participants up in (see schedules.py)")
+    parser.add_argument("--swarm-size", type=int, default=0, help="enemies per maze in swarm mode")
+    args = parser.parse_args()
+
+    policies = [parse_policy(spec) for spec in args.policy or ["trust", "trust-male-70", "random"]]
+    start = time.perf_counter()
+    outcomes = run_batch(
+        policies, args.sessions, args.levels, args.seed, args.workers, args.out,
+        maze_bank=args.maze_bank, maze_band=args.maze_band, schedule_file=args.schedule_file, swarm_size=args.swarm_size,
+    )
+    elapsed = time.perf_counter() - start
+
+    total = args.sessions * len(policies)
+    print(f"Simulated {total} sessions in {elapsed:.1f}s ({total / elapsed * 60:.0f}/min) -> {args.out}")
+    for name, counts in outcomes.items():
+        print(f"  {name}: {counts}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+import operator
+from array import array
+from itertools import compress, repeat
+
+import pygame
+
+from maze import OPEN_CELLS, UNREACHABLE
+from session import ENEMY_MOVE_DELAY
+
+SPAWN_CLEARANCE = 8   # path steps between the player's start and the nearest enemy
+SPEED_SPREAD = 0.3    # move delays vary by up to this share either way, so the swarm does not move in lockstep
+
+
+class Swarm:
+    """
+    Many enemies chasing the player, kept as arrays of cells (padded grid indexes, see
+    `Maze.padded_grid`) and move timings instead of one `Enemy` object each. Every tick the enemies
+    that are due step together along a next-hop table shared by the whole swarm: a cell's hop is
+    worked out once from the maze's distance field to the player and reused by every enemy passing
+    through it until the player moves. Drawing restores and redraws only the cells that changed,
+    in one `blits` call each.
+    """
+
+    def __init__(self, maze, player, count, rng, now=0, move_delay=ENEMY_MOVE_DELAY):
+        self.maze = maze
+        self.player = player
+        self.padded_cols = padded_cols = maze.num_cols + 2
+        self.grid = grid = maze.padded_grid()
+        self.steps = (1, -1, padded_cols, -padded_cols)  # same preference order as `Maze.step_towards`
+
+        # Spawn on random open cells out of immediate reach of the player's start
+        source, dist = maze.distances_from(maze.start)
+        cell_distance = maze.graph.cell_distance
+        open_cells = list(compress(range(len(grid)), grid.translate(OPEN_CELLS)))
+        far = [cell for cell in open_cells if SPAWN_CLEARANCE <= cell_distance(dist, source, cell) < UNREACHABLE]
+        if not far:
+            raise ValueError(f"No open cell is {SPAWN_CLEARANCE} steps from the start, so the maze is too small for a swarm")
+        self.cells = array("i", rng.choices(far, k=count))
+        self.delays = array("i", (round(move_delay * rng.uniform(1 - SPEED_SPREAD, 1 + SPEED_SPREAD)) for _ in range(count)))
+        self.due = array("q", repeat(now, count))  # game ms at which each enemy takes its next step
+        self.active = False
+
+        self._hops = None        # next cell for each cell, -1 until asked for; valid for `_hops_field`
+        self._hops_field = None
+        self._vacated = set()    # cells to restore and/or redraw on the next `draw`
+        self._entered = set()
+        self._rects = {}
+        radius = max(1, maze.cell_size // 2 - 4)  # same red circle as `Enemy.draw`
+        self.sprite = pygame.Surface((maze.cell_size, maze.cell_size))
+        self.sprite.fill((1, 1, 1))
+        self.sprite.set_colorkey((1, 1, 1))
+        pygame.draw.circle(self.sprite, (255, 0, 0), (maze.cell_size // 2, maze.cell_size // 2), radius)
+        self.sprite = self.sprite.convert()
+
+    def start(self, now):
+        """Starts every enemy's cadence from `now`, as `Enemy.last_move_time = now` does for one enemy."""
+        self.due = array("q", (now + delay for delay in self.delays))
+        self.active = True
+
+    def _hop(self, cell, field):
+        """The open neighbour of `cell` closest to the player, or `cell` itself if none is closer."""
+        source, dist = field
+        cell_distance = self.maze.graph.cell_distance
+        grid = self.grid
+        best, best_distance = cell, cell_distance(dist, source, cell)
+        for step in self.steps:
+            neighbour = cell + step
+            if not grid[neighbour]:
+                distance = cell_distance(dist, source, neighbour)
+                if distance < best_distance:
+                    best, best_distance = neighbour, distance
+        return best
+
+    def move(self, now):
+        """Takes every step due by `now` (game clock, ms) for the whole swarm."""
+        if not self.active:
+            return
+        due = self.due
+        ready = list(compress(range(len(due)), map(operator.le, due, repeat(now))))
+        if not ready:
+            return
+
+        field = self.maze.distance_field((self.player.x, self.player.y))
+        if field is not self._hops_field:
+            self._hops = array("i", [-1]) * len(self.grid)
+            self._hops_field = field
+        hops = self._hops
+        cells, delays = self.cells, self.delays
+        for i in ready:
+            cell = start = cells[i]
+            delay = delays[i]
+            next_due = due[i]
+            if now - next_due >= delay:
+                next_due = now  # fell behind (e.g. a long frame): step once and restart the cadence
+            while next_due <= now:
+                hop = hops[cell]
+                if hop < 0:
+                    hop = hops[cell] = self._hop(cell, field)
+                cell = hop
+                next_due += delay
+            due[i] = next_due
+            if cell != start:
+                cells[i] = cell
+                self._vacated.add(start)
+                self._entered.add(cell)
+
+    def has_caught(self, player):
+        return self.index(player.x, player.y) in self.cells
+
+    def _rect(self, cell):
+        rect = self._rects.get(cell)
+        if rect is None:
+            rect = self._rects[cell] = self.maze.cell_rect(cell % self.padded_cols - 1, cell // self.padded_cols - 1)
+        return rect
+
+    def draw(self, also=()):
+        """
+        Restores the cells enemies left since the last call (plus the cells in `also`, e.g. where the
+        player was), redraws the enemies on them and on the cells they entered, and returns the
+        screen rects that changed.
+        """
+        dirty = self._vacated | self._entered
+        dirty.update(also)
+        if not dirty:
+            return []
+        self._vacated.clear()
+        self._entered.clear()
+
+        maze = self.maze
+        rects = [self._rect(cell) for cell in dirty]
+        maze.screen.blits([(maze.layer, rect, rect.move(-maze.offset_x, -maze.offset_y)) for rect in rects], False)
+        occupied = dirty.intersection(self.cells)
+        maze.screen.blits([(self.sprite, self._rect(cell)) for cell in occupied], False)
+        return rects
+
+    def draw_all(self):
+        """Draws every enemy, for a full frame."""
+        self._vacated.clear()
+        self._entered.clear()
+        self.maze.screen.blits([(self.sprite, self._rect(cell)) for cell in set(self.cells)], False)
+
+    def index(self, x, y):
+        """Padded grid index of a maze cell, as used in `cells`."""
+        return (y + 1) * self.padded_cols + x + 1
@@ -0,0 +1,54 @@
+import queue
+import time
+
+
+class Telemetry:
+    """
+    Publishes live session state to the control server through a bounded multiprocessing queue.
+
+    `put_nowait` hands messages to the queue's feeder thread, so publishing never blocks the render
+    loop; when the server falls behind and the queue is full the message is dropped and counted.
+    With no queue every call is a no-op.
+    """
+
+    def __init__(self, channel=None, snapshot=None, interval_ms=250):
+        self.channel = channel
+        self.snapshot = snapshot
+        self.interval_ms = interval_ms
+        self.dropped_messages = 0
+        self._next_publish = 0
+        self._reset_window()
+
+    def _reset_window(self):
+        self._frames = 0
+        self._total_frame_ms = 0
+        self._worst_frame_ms = 0
+
+    def frame(self, now, frame_ms):
+        """Called once per frame with the game clock and the last frame time; publishes every `interval_ms`."""
+        if self.channel is None:
+            return
+        self._frames += 1
+        self._total_frame_ms += frame_ms
+        if frame_ms > self._worst_frame_ms:
+            self._worst_frame_ms = frame_ms
+        if now >= self._next_publish:
+            self.publish(now)
+
+    def publish(self, now):
+        if self.channel is None:
+            return
+        message = self.snapshot() if self.snapshot is not None else {}
+        message.update({
+            "sent_at": time.time(),
+            "frames": self._frames,
+            "mean_frame_ms": round(self._total_frame_ms / self._frames, 2) if self._frames else None,
+            "worst_frame_ms": self._worst_frame_ms,
+            "dropped_messages": self.dropped_messages,
+        })
+        try:
+            self.channel.put_nowait(message)
+        except queue.Full:
+            self.dropped_messages += 1
+        self._next_publish = now + self.interval_ms
+        self._reset_window()
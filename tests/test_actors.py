@@ -0,0 +1,58 @@
+import pygame
+
+from actors import Player
+from maze import Maze
+from session import PLAYER_MOVE_DELAY
+
+# A corridor along the top with a single turn down at x=3:
+#   . . . . .
+#   # # # . #
+#   # # # . .
+GRID = bytes([
+    0, 0, 0, 0, 0,
+    1, 1, 1, 0, 1,
+    1, 1, 1, 0, 0,
+])
+
+
+def key(kind, code):
+    return pygame.event.Event(kind, key=code)
+
+
+def walk(player, start, steps):
+    """Moves the player one step per PLAYER_MOVE_DELAY and returns the cells it was on."""
+    path = []
+    for i in range(1, steps + 1):
+        player.move(start + i * PLAYER_MOVE_DELAY)
+        path.append((player.x, player.y))
+    return path
+
+
+def test_held_turn_is_taken_at_the_junction():
+    player = Player(Maze(None, num_cols=5, num_rows=3, grid=GRID, goal=(4, 2)))
+    player.handle_event(key(pygame.KEYDOWN, pygame.K_RIGHT), 0, 0)
+    assert walk(player, 0, 1) == [(1, 0)]
+
+    # Two cells before the junction, press DOWN and keep both keys held
+    player.handle_event(key(pygame.KEYDOWN, pygame.K_DOWN), 0, PLAYER_MOVE_DELAY)
+    assert walk(player, PLAYER_MOVE_DELAY, 4) == [(2, 0), (3, 0), (3, 1), (3, 2)]
+
+
+def test_held_turn_outlasting_the_buffer_still_corners():
+    player = Player(Maze(None, num_cols=5, num_rows=3, grid=GRID, goal=(4, 2)))
+    player.handle_event(key(pygame.KEYDOWN, pygame.K_RIGHT), 0, 0)
+    player.handle_event(key(pygame.KEYDOWN, pygame.K_DOWN), 0, 0)
+    # Moving slowly enough that the buffered turn expires before the junction
+    path = []
+    for i in range(1, 6):
+        player.move(i * 1000)
+        path.append((player.x, player.y))
+    assert path == [(1, 0), (2, 0), (3, 0), (3, 1), (3, 2)]
+
+
+def test_released_keys_stop_the_player():
+    player = Player(Maze(None, num_cols=5, num_rows=3, grid=GRID, goal=(4, 2)))
+    player.handle_event(key(pygame.KEYDOWN, pygame.K_RIGHT), 0, 0)
+    walk(player, 0, 1)
+    player.handle_event(key(pygame.KEYUP, pygame.K_RIGHT), 0, PLAYER_MOVE_DELAY)
+    assert walk(player, PLAYER_MOVE_DELAY + 1000, 2) == [(1, 0), (1, 0)]
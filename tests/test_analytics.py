@@ -0,0 +1,37 @@
+from analytics import TrialStore
+
+OLD_HEADER = "timestamp,participant_id,hallway,trial,agent_image,correct_door,player_choice,correct,health_after,time_remaining\n"
+HEADER = "timestamp,participant_id,hallway,trial,agent_image,advised_door,correct_door,player_choice,correct,health_after,time_remaining\n"
+
+
+def test_rows_without_advice_are_left_out_of_compliance(tmp_path):
+    data = tmp_path / "data"
+    data.mkdir()
+    # Written before advised_door was logged
+    (data / "P-00001_trials.csv").write_text(OLD_HEADER + "t,P-00001,1,1,M1.png,left,left,True,100,120.0\n")
+    (data / "P-00002_trials.csv").write_text(
+        HEADER
+        + "t,P-00002,1,1,M1.png,left,right,left,False,95,120.0\n"
+        + "t,P-00002,1,2,M1.png,right,right,left,False,90,110.0\n"
+    )
+
+    store = TrialStore(str(tmp_path / "store"))
+    assert store.ingest(str(data)) == 3
+    row = store.summarize("agent")["M1.png"]
+    assert row["trials"] == 3
+    assert row["no_advice"] == 1
+    assert row["compliance_rate"] == 0.5
+    assert row["misled_compliance_rate"] == 1.0
+    assert row["accuracy"] == 1 / 3
+
+
+def test_only_old_rows_report_no_compliance(tmp_path):
+    data = tmp_path / "data"
+    data.mkdir()
+    (data / "P-00001_trials.csv").write_text(OLD_HEADER + "t,P-00001,1,1,M1.png,left,left,True,100,120.0\n")
+
+    store = TrialStore(str(tmp_path / "store"))
+    store.ingest(str(data))
+    row = store.summarize("class")["male"]
+    assert row["compliance_rate"] is None and row["misled_compliance_rate"] is None
+    assert row["accuracy"] == 1.0
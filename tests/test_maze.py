@@ -0,0 +1,66 @@
+import random
+from collections import deque
+
+import pytest
+
+from maze import Maze
+
+
+def reference_distances(maze, source):
+    """Plain cell-by-cell BFS over the unpadded grid: {(x, y): steps}."""
+    dist = {source: 0}
+    queue = deque([source])
+    while queue:
+        x, y = queue.popleft()
+        for nx, ny in ((x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)):
+            if maze.is_walkable(nx, ny) and (nx, ny) not in dist:
+                dist[nx, ny] = dist[x, y] + 1
+                queue.append((nx, ny))
+    return dist
+
+
+def random_mazes(count, seed=0):
+    rng = random.Random(seed)
+    for i in range(count):
+        cols, rows = rng.randrange(3, 42), rng.randrange(3, 42)
+        complexity = rng.choice((0, 0, 0.05, 0.2, 0.6, 1))
+        yield Maze(None, complexity=complexity, num_cols=cols, num_rows=rows, seed=i)
+
+
+@pytest.mark.parametrize("maze", list(random_mazes(300)), ids=lambda maze: f"{maze.num_cols}x{maze.num_rows}")
+def test_graph_distances_match_bfs(maze):
+    rng = random.Random(maze.num_cols * 1000 + maze.num_rows)
+    open_cells = [(x, y) for y in range(maze.num_rows) for x in range(maze.num_cols) if maze.is_walkable(x, y)]
+    for source in [maze.start, maze.goal] + rng.sample(open_cells, min(2, len(open_cells))):
+        expected = reference_distances(maze, source)
+        field = maze.distances_from(source)
+        for y in range(maze.num_rows):
+            for x in range(maze.num_cols):
+                assert maze.distance_to(field, x, y) == expected.get((x, y), -1), (source, (x, y))
+
+        # Every step towards the source gets one closer
+        for cell in rng.sample(open_cells, min(20, len(open_cells))):
+            step = maze.step_towards(*cell, field)
+            if cell == source:
+                assert step == cell
+            else:
+                assert expected[step] == expected[cell] - 1
+
+        furthest = max(expected.values())
+        first = min((cell for cell, distance in expected.items() if distance == furthest), key=lambda c: (c[1], c[0]))
+        assert maze.furthest_from(source) == (first, furthest)
+
+
+def test_goal_is_the_furthest_cell_from_the_start():
+    for maze in random_mazes(100, seed=1):
+        furthest, distance = maze.furthest_from(maze.start)
+        assert maze.path_length(maze.start, maze.goal) == distance
+        if maze.complexity > 0:
+            assert maze.goal == furthest  # perfect mazes keep the deepest carve, which may be another tie
+        # A prebuilt grid without a goal picks the first furthest cell
+        assert Maze(None, num_cols=maze.num_cols, num_rows=maze.num_rows, grid=maze.grid).goal == furthest
+
+
+def test_loop_maze_construction_leaves_the_graph_unbuilt():
+    maze = Maze(None, complexity=0.2, num_cols=41, num_rows=41, seed=3)
+    assert maze._graph is None
@@ -0,0 +1,42 @@
+import pygame
+
+from profiler import FrameProfiler
+
+
+def test_enabling_mid_frame_starts_timing_at_the_next_frame():
+    pygame.init()
+    screen = pygame.display.set_mode((200, 200))
+    profiler = FrameProfiler()
+
+    profiler.begin_frame()               # off: nothing recorded
+    profiler.toggle_overlay(screen)      # F3 handled inside the frame
+    profiler.lap("events")
+    profiler.end_frame(screen)
+    assert not profiler.phases_ns and not profiler.work_ns
+
+    profiler.begin_frame()
+    profiler.lap("events")
+    profiler.end_frame(screen)
+    assert len(profiler.phases_ns["events"]) == 1
+    assert profiler.work_ns[0] < 1_000_000_000
+    pygame.quit()
+
+
+def test_overlay_never_stays_on_the_screen_surface():
+    pygame.init()
+    screen = pygame.display.set_mode((400, 200))
+    profiler = FrameProfiler(overlay=True)
+    screen.fill((255, 0, 0))
+
+    profiler.begin_frame()
+    profiler.end_frame(screen)
+    under_panel = profiler._panel_rect.center
+    assert screen.get_at(under_panel) == (255, 0, 0)
+
+    # The next scene repaints underneath, then F3 turns the overlay off
+    screen.fill((0, 0, 255))
+    profiler.begin_frame()
+    profiler.end_frame(screen)
+    profiler.toggle_overlay(screen)
+    assert screen.get_at(under_panel) == (0, 0, 255)
+    pygame.quit()
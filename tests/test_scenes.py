@@ -0,0 +1,36 @@
+from types import SimpleNamespace
+
+import pygame
+
+from scenes import HallwayScene
+
+
+class FakeGame(SimpleNamespace):
+    def __init__(self):
+        super().__init__(health=100, num_levels=1, events=[], decisions=[],
+                         scheduler=SimpleNamespace(now=0), telemetry=SimpleNamespace(publish=lambda now: None))
+
+    def _log_event(self, event_ns, scene, event, key, hallway=None, trial=None):
+        self.events.append((event_ns, scene, event, key, hallway, trial))
+
+    def _log_decision(self, hallway, trial, choice, *args):
+        self.decisions.append((hallway, trial, choice))
+
+    def _update_health(self, delta):
+        self.health += delta
+
+    def _final_victory_screen(self):
+        pass
+
+
+def test_keys_after_the_decision_in_the_same_poll_are_logged():
+    game = FakeGame()
+    scene = HallwayScene(game, 0, iter(()), 4, "F1.png", "left", "left")
+    for key, event_ns in [(pygame.K_LEFT, 10), (pygame.K_RIGHT, 11), (pygame.K_x, 12)]:
+        scene.handle_event(pygame.event.Event(pygame.KEYDOWN, key=key), event_ns)
+
+    assert game.decisions == [(0, 4, "left")]
+    assert game.events == [
+        (11, "hallway", "ignored_keydown", "right", 0, 4),
+        (12, "hallway", "ignored_keydown", "x", 0, 4),
+    ]
@@ -0,0 +1,30 @@
+import random
+
+import pygame
+import pytest
+
+from actors import Player
+from maze import Maze
+from swarm import SPAWN_CLEARANCE, Swarm
+
+
+@pytest.fixture
+def screen():
+    pygame.init()
+    yield pygame.display.set_mode((200, 200))
+    pygame.quit()
+
+
+def test_enemies_spawn_out_of_reach_of_the_start(screen):
+    maze = Maze(screen, num_cols=25, num_rows=25, seed=3)
+    swarm = Swarm(maze, Player(maze), 300, random.Random(0))
+    cols = swarm.padded_cols
+    for cell in swarm.cells:
+        assert maze.path_length(maze.start, (cell % cols - 1, cell // cols - 1)) >= SPAWN_CLEARANCE
+
+
+def test_a_maze_without_room_for_the_swarm_is_refused(screen):
+    # A corridor too short to put any enemy SPAWN_CLEARANCE steps from the start
+    maze = Maze(screen, num_cols=SPAWN_CLEARANCE, num_rows=1, grid=bytes(SPAWN_CLEARANCE), goal=(SPAWN_CLEARANCE - 1, 0))
+    with pytest.raises(ValueError):
+        Swarm(maze, Player(maze), 10, random.Random(0))
@@ -0,0 +1,31 @@
+import time
+
+
+class FrameStats:
+    """Per-trial frame accounting on the monotonic perf_counter_ns clock (or `clock`, e.g. a simulated one)."""
+
+    def __init__(self, fps, clock=time.perf_counter_ns):
+        self.frame_budget_ns = 1_000_000_000 / fps
+        self.clock = clock
+        self.reset()
+
+    def reset(self):
+        self.onset_ns = None      # first frame of the trial shown on screen
+        self.frames = 0
+        self.dropped = 0
+        self.worst_frame_ns = 0
+        self._last_present_ns = None
+
+    def presented(self):
+        """Call right after each display update; returns its timestamp."""
+        now = self.clock()
+        if self.onset_ns is None:
+            self.onset_ns = now
+        if self._last_present_ns is not None:
+            frame_ns = now - self._last_present_ns
+            self.worst_frame_ns = max(self.worst_frame_ns, frame_ns)
+            # Every whole frame budget the interval overran is a frame that never made it to screen
+            self.dropped += max(0, int(frame_ns / self.frame_budget_ns + 0.5) - 1)
+        self._last_present_ns = now
+        self.frames += 1
+        return now
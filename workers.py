@@ -0,0 +1,140 @@
+"""
+Pre-warmed game worker processes for the control server.
+
+A worker initialises pygame, opens the display and preloads every image before any session
+exists, then waits on a pipe for a session config. Starting a session is just a message.
+"""
+import multiprocessing
+import os
+import signal
+import sys
+import threading
+import time
+from collections import deque
+
+
+def worker_main(conn, telemetry_channel, stop_event, width, height):
+    # Terminating is only the fallback when a stop request is not honoured in time; still exit normally
+    # so the trial logger drains at exit
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+    import pygame
+    from assetbundle import open_bundle
+    from assets import AssetManager
+    from main import Game, asset_requests, list_assistants
+
+    pygame.init()
+    pygame.display.set_mode((width, height))
+    pygame.font.SysFont("Arial", 28)  # the first SysFont call scans the system fonts
+    assets = AssetManager(bundle=open_bundle())
+    assets.preload(asset_requests(width, height, list_assistants()))
+    conn.send(("ready", os.getpid()))
+
+    kind, config = conn.recv()
+    if kind != "start" or stop_event.is_set():
+        return
+    game = Game(
+        width, height, assets=assets,
+        on_first_frame=lambda: conn.send(("first_frame", time.monotonic())),
+        telemetry_channel=telemetry_channel, stop_event=stop_event,
+        **config
+    )
+    conn.send(("ack", config["participant_id"]))
+    game.run()
+
+
+class Worker:
+    def __init__(self, width, height):
+        self.conn, child_conn = multiprocessing.Pipe()
+        # Live state from the game; bounded so a stalled server makes the game drop messages, not wait
+        self.telemetry = multiprocessing.Queue(maxsize=64)
+        # Checked by the game once per frame; see `stop`
+        self.stop_event = multiprocessing.Event()
+        self.process = multiprocessing.Process(
+            target=worker_main, args=(child_conn, self.telemetry, self.stop_event, width, height), daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        self.ready = False
+
+    def poll_ready(self, timeout=0):
+        if not self.ready and self.process.is_alive() and self.conn.poll(timeout):
+            kind, _ = self.conn.recv()
+            self.ready = kind == "ready"
+        return self.ready
+
+    def start_session(self, config, requested_at, timeout=10):
+        """
+        Hands `config` to the worker and waits for its acknowledgement and first frame.
+        Returns milliseconds from `requested_at` (time.monotonic) to each, None if it timed out.
+        """
+        timings = {"warm": self.ready, "ack_ms": None, "first_frame_ms": None}
+        deadline = requested_at + timeout
+        if not self.poll_ready(timeout):
+            return timings
+        self.conn.send(("start", config))
+
+        while None in (timings["ack_ms"], timings["first_frame_ms"]):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not self.conn.poll(remaining):
+                break
+            kind, value = self.conn.recv()
+            if kind == "ack":
+                timings["ack_ms"] = round((time.monotonic() - requested_at) * 1000, 1)
+            elif kind == "first_frame":
+                timings["first_frame_ms"] = round((value - requested_at) * 1000, 1)
+        return timings
+
+    def stop(self, deadline):
+        """
+        Asks the session to end at its next frame and waits up to `deadline` seconds for the process to
+        exit, then terminates and finally kills it. Returns how it ended: "clean", "terminated" or "killed".
+        """
+        self.stop_event.set()
+        self.process.join(deadline)
+        if not self.process.is_alive():
+            return "clean"
+        self.process.terminate()
+        self.process.join(1)
+        if not self.process.is_alive():
+            return "terminated"
+        self.process.kill()
+        self.process.join()
+        return "killed"
+
+
+class WorkerPool:
+    """Keeps `size` initialised workers waiting; each one serves a single session."""
+
+    def __init__(self, size, width=800, height=800):
+        self.size = size
+        self.width = width
+        self.height = height
+        self._idle = deque()
+        self._lock = threading.Lock()
+
+    def fill(self):
+        with self._lock:
+            self._idle = deque(worker for worker in self._idle if worker.process.is_alive())
+            missing = self.size - len(self._idle)
+        for _ in range(missing):
+            worker = Worker(self.width, self.height)
+            with self._lock:
+                self._idle.append(worker)
+
+    def acquire(self):
+        """Takes the warmest idle worker, or starts a cold one if the pool is empty, and refills in the background."""
+        with self._lock:
+            alive = [worker for worker in self._idle if worker.process.is_alive()]
+            ready = [worker for worker in alive if worker.poll_ready()]
+            worker = (ready or alive or [None])[0]
+            if worker is not None:
+                self._idle.remove(worker)
+        if worker is None:
+            worker = Worker(self.width, self.height)
+        threading.Thread(target=self.fill, daemon=True).start()
+        return worker
+
+    def idle_count(self):
+        with self._lock:
+            return sum(1 for worker in self._idle if worker.process.is_alive())